@@ -6,10 +6,121 @@ Version 29: Korrekte Activity-Verarbeitung und intelligente Unpublish-Erkennung
 import streamlit as st
 import requests
 import base64
+import orjson
 import time
+import threading
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from utils import days_since_date, format_api_credentials_debug, is_app_product
+from typing import NamedTuple, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from streamlit.runtime.scriptrunner_utils.script_run_context import SCRIPT_RUN_CONTEXT_ATTR_NAME
+from utils import days_since_date, format_api_credentials_debug
+
+
+# Maximale Anzahl gleichzeitiger API-Anfragen bei der Verifikation
+MAX_PARALLEL_REQUESTS = 8
+
+# Maximale Anfragen pro Sekunde an die Duda API (Token-Bucket)
+API_RATE_LIMIT = 25
+
+# Gültigkeitsdauer (Sekunden) zwischengespeicherter Site-Status-Abfragen
+SITE_STATUS_CACHE_TTL = 300
+
+# Activity-Typen der Duda API die den Publish-Status einer Site ändern
+PUBLISH_ACTIVITY_TYPES = frozenset({'site_published', 'site_unpublished'})
+
+# Maximale Anzahl Bytes die von Fehler-Bodys gelesen werden (Diagnose-Ausschnitt)
+ERROR_SNIPPET_BYTES = 512
+
+# Erklärungen zu HTTP-Status-Codes der Duda API
+_ERROR_EXPLANATIONS = {
+    400: "Bad Request - Die Anfrage ist fehlerhaft formatiert",
+    401: "Unauthorized - API Credentials sind ungültig oder fehlen",
+    403: "Forbidden - Keine Berechtigung für diese Aktion. Mögliche Ursachen:\n" +
+         "• API Username/Password ist falsch\n" +
+         "• Account hat keine API-Berechtigung\n" +
+         "• Kein Zugriff auf die abgefragten Sites",
+    404: "Not Found - Die angeforderte Ressource existiert nicht",
+    429: "Too Many Requests - Rate Limit erreicht, bitte warten",
+    500: "Internal Server Error - Duda Server Problem",
+    502: "Bad Gateway - Duda Service temporär nicht verfügbar",
+    503: "Service Unavailable - Duda API ist temporär offline"
+}
+
+# Circuit Breaker: nach so vielen Auth-Fehlern in Folge werden keine weiteren Calls gemacht
+# (nur 401 - ein 403 betrifft eine einzelne Site eines anderen Accounts, nicht die Credentials)
+AUTH_FAILURE_CODES = (401,)
+AUTH_CB_THRESHOLD = 5
+AUTH_CIRCUIT_OPEN_ERROR = 'auth_failed (circuit open)'
+
+# Antwortcodes die sich bei erneuter Abfrage nicht ändern (werden gecacht)
+CACHEABLE_STATUS_CODES = (200, 403, 404)
+
+
+class PublishInfo(NamedTuple):
+    """Ausgewertete Publishing-Historie einer Site (einmal pro Abruf berechnet)"""
+    last_unpublish_date: Optional[str]
+    last_unpublish_info: Optional[dict]
+    last_publish_date: Optional[str]
+    last_publish_info: Optional[dict]
+    is_currently_offline: bool
+    days_since_unpublish: Optional[int]
+    history: list
+
+
+EMPTY_PUBLISH_INFO = PublishInfo(None, None, None, None, False, None, ())
+
+
+class RateLimiter:
+    """Thread-sicherer Token-Bucket - blockiert nur wenn das Kontingent erschöpft ist"""
+    
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Wartet bis ein Token verfügbar ist und verbraucht es"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                
+                wait = (1 - self._tokens) / self.rate
+            
+            time.sleep(wait)
+
+
+class AuthCircuitBreaker:
+    """Thread-sicherer Zähler für Auth-Fehler in Folge - gilt nur für einen Verifikationslauf"""
+    
+    def __init__(self, threshold=AUTH_CB_THRESHOLD):
+        self.threshold = threshold
+        self._consec_failures = 0
+        self._lock = threading.Lock()
+    
+    def is_open(self):
+        """True sobald threshold Auth-Fehler in Folge aufgetreten sind"""
+        with self._lock:
+            return self._consec_failures >= self.threshold
+    
+    def record(self, code):
+        """Zählt Auth-Fehler - jede reguläre Antwort (auch 403/404) beweist gültige Credentials"""
+        with self._lock:
+            if code in AUTH_FAILURE_CODES:
+                self._consec_failures += 1
+            elif code in CACHEABLE_STATUS_CODES:
+                self._consec_failures = 0
 
 
 class DudaAPIVerifier:
@@ -21,6 +132,23 @@ class DudaAPIVerifier:
         self.api_password = None
         self.api_endpoint = None
         self.debug_mode = False
+        self.max_parallel_requests = MAX_PARALLEL_REQUESTS
+        self.status_cache_ttl = SITE_STATUS_CACHE_TTL
+        
+        # Gemeinsame HTTP-Session: Verbindungen (inkl. TLS-Handshake) werden wiederverwendet
+        # 429-Antworten werden vom Retry mit Backoff und unter Beachtung von Retry-After wiederholt
+        self._session = requests.Session()
+        retry = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 502, 503],
+            allowed_methods=["GET"],
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=64, max_retries=retry)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._rate_limiter = RateLimiter(API_RATE_LIMIT)
         
         # Prüfe ob API Credentials verfügbar sind
         if "duda" in st.secrets:
@@ -31,8 +159,58 @@ class DudaAPIVerifier:
             
             # Debug-Modus aus Secrets laden (optional)
             self.debug_mode = st.secrets["duda"].get("debug_mode", False)
+            
+            # Parallelität optional über Secrets anpassbar (Rate Limit bleibt davon unberührt)
+            self.max_parallel_requests = max(1, int(st.secrets["duda"].get("max_parallel_requests", MAX_PARALLEL_REQUESTS)))
+            
+            # Cache-Dauer für Site-Status optional über Secrets anpassbar (0 = kein Cache)
+            self.status_cache_ttl = float(st.secrets["duda"].get("status_cache_ttl", SITE_STATUS_CACHE_TTL))
+        
+        # Basic Auth Header einmalig berechnen (Credentials ändern sich nicht)
+        self._auth_header = None
+        if self.api_available:
+            auth_string = f"{self.api_username}:{self.api_password}"
+            self._auth_header = 'Basic ' + base64.b64encode(auth_string.encode('ascii')).decode('ascii')
+        
+        self._default_headers = {
+            'Content-Type': 'application/json',
+            'User-Agent': 'Duda-Billing-Control/1.0'
+        }
+        if self._auth_header:
+            self._default_headers['Authorization'] = self._auth_header
+        self._session.headers.update(self._default_headers)
+        
+        # URL-Templates einmalig aufbauen (Endpoint ändert sich nicht)
+        self._site_url = f"{self.api_endpoint}/api/sites/multiscreen/{{sid}}"
+        self._activities_url = self._site_url + "/activities"
+        
+        # Eigener Pool für Activities-Abfragen, die parallel zu den Site-Details laufen
+        self._activities_executor = ThreadPoolExecutor(max_workers=self.max_parallel_requests)
+        
+        # Cache für Site-Status (Site-ID → (Zeitstempel, Result))
+        self._status_cache = {}
+        self._status_cache_lock = threading.Lock()
+    
+    def _api_get(self, url, params=None, timeout=10):
+        """Zentraler GET-Aufruf gegen die Duda API (Session, Auth-Header, Rate Limit)
+        
+        Der Body wird gestreamt: Erfolgsantworten über response.content vollständig lesen,
+        Fehlerantworten über _read_error_snippet (liest nur den Anfang und gibt die Verbindung frei).
+        """
+        self._rate_limiter.acquire()
+        return self._session.get(url, params=params, timeout=timeout, stream=True)
+    
+    def _read_error_snippet(self, response, limit=ERROR_SNIPPET_BYTES):
+        """Liest höchstens limit Bytes eines Fehler-Bodys und schließt die Response"""
+        try:
+            chunk = next(response.iter_content(limit), b'')
+        except Exception:
+            chunk = b''
+        finally:
+            response.close()
+        return chunk.decode(response.encoding or 'utf-8', errors='replace')
     
-    def test_api_connection(self, test_site_id="63609f38"):
+    def test_api_connection(self, test_site_id="63609f38", debug=None):
         """Testet die API-Verbindung mit einem Site-spezifischen Call"""
         if not self.api_available:
             return {
@@ -43,35 +221,28 @@ class DudaAPIVerifier:
         
         try:
             # Test mit bekannter Site-ID (funktioniert bei Enterprise Accounts)
-            url = f"{self.api_endpoint}/api/sites/multiscreen/{test_site_id}"
+            url = self._site_url.format(sid=test_site_id)
             
-            # Basic Auth Header
-            auth_string = f"{self.api_username}:{self.api_password}"
-            auth_bytes = auth_string.encode('ascii')
-            auth_header = base64.b64encode(auth_bytes).decode('ascii')
-            
-            headers = {
-                'Authorization': f'Basic {auth_header}',
-                'Content-Type': 'application/json',
-                'User-Agent': 'Duda-Billing-Control/1.0'
-            }
+            # Ohne Debug-Ausgaben auch aus Hintergrund-Threads aufrufbar (kein st.* Zugriff)
+            debug = self.debug_mode if debug is None else debug
             
-            if self.debug_mode:
+            if debug:
                 st.write("🔍 **Debug - API Test:**")
                 st.write(f"URL: {url}")
                 st.write(f"Credentials: {format_api_credentials_debug(self.api_username)}")
                 st.write(f"Test Site ID: {test_site_id}")
             
             # API Call mit kurzem Timeout
-            response = requests.get(url, headers=headers, timeout=10)
+            response = self._api_get(url, timeout=10)
+            error_text = self._read_error_snippet(response) if response.status_code != 200 else ''
             
-            if self.debug_mode:
+            if debug:
                 st.write(f"Response Status: {response.status_code}")
                 if response.status_code != 200:
-                    st.write(f"Response Body: {response.text[:500]}")
+                    st.write(f"Response Body: {error_text[:500]}")
             
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 return {
                     'success': True,
                     'test_site_id': test_site_id,
@@ -91,7 +262,7 @@ class DudaAPIVerifier:
                     'success': False,
                     'error': f'HTTP {response.status_code}',
                     'status_code': response.status_code,
-                    'response_text': response.text[:200],
+                    'response_text': error_text[:200],
                     'details': self._interpret_error_code(response.status_code)
                 }
                 
@@ -116,75 +287,87 @@ class DudaAPIVerifier:
     
     def _interpret_error_code(self, status_code):
         """Interpretiert HTTP-Status-Codes und gibt hilfreiche Erklärungen"""
-        error_explanations = {
-            400: "Bad Request - Die Anfrage ist fehlerhaft formatiert",
-            401: "Unauthorized - API Credentials sind ungültig oder fehlen",
-            403: "Forbidden - Keine Berechtigung für diese Aktion. Mögliche Ursachen:\n" +
-                 "• API Username/Password ist falsch\n" +
-                 "• Account hat keine API-Berechtigung\n" +
-                 "• Kein Zugriff auf die abgefragten Sites",
-            404: "Not Found - Die angeforderte Ressource existiert nicht",
-            429: "Too Many Requests - Rate Limit erreicht, bitte warten",
-            500: "Internal Server Error - Duda Server Problem",
-            502: "Bad Gateway - Duda Service temporär nicht verfügbar",
-            503: "Service Unavailable - Duda API ist temporär offline"
-        }
-        
-        return error_explanations.get(status_code, f"HTTP {status_code} - Unbekannter Fehler")
+        return _ERROR_EXPLANATIONS.get(status_code, f"HTTP {status_code} - Unbekannter Fehler")
     
-    def get_site_status(self, site_id):
-        """Holt den aktuellen Status einer Site von der Duda API"""
+    def get_site_status(self, site_id, debug=None):
+        """Holt den aktuellen Status einer Site (mit TTL-Cache pro Site-ID)"""
         if not self.api_available:
             return None
-            
+        
+        # debug gilt nur für diesen Aufruf - der geteilte Verifier bleibt unverändert
+        debug = self.debug_mode if debug is None else debug
+        
+        with self._status_cache_lock:
+            cached = self._status_cache.get(site_id)
+        if cached and time.monotonic() - cached[0] < self.status_cache_ttl:
+            if debug:
+                st.write(f"📋 Cache-Treffer für {site_id}")
+            return cached[1]
+        
+        # Activities nur spekulativ parallel abrufen, wenn die Site zuletzt nicht mit 403/404 geantwortet hat
+        # (abgelaufene Cache-Einträge bleiben als Hinweis erhalten)
+        prefetch_activities = not cached or cached[1].get('api_response_code') == 200
+        result = self._fetch_site_status(site_id, debug, prefetch_activities)
+        
+        # Nur eindeutige Antworten cachen - Timeouts/Serverfehler erneut versuchen
+        if result and result.get('api_response_code') in CACHEABLE_STATUS_CODES:
+            with self._status_cache_lock:
+                self._status_cache[site_id] = (time.monotonic(), result)
+        
+        return result
+    
+    def _fetch_site_status(self, site_id, debug, prefetch_activities=True):
+        """Holt den aktuellen Status einer Site von der Duda API"""
         try:
             # Duda API Endpoint für Site Details
-            url = f"{self.api_endpoint}/api/sites/multiscreen/{site_id}"
-            
-            # Basic Auth Header
-            auth_string = f"{self.api_username}:{self.api_password}"
-            auth_bytes = auth_string.encode('ascii')
-            auth_header = base64.b64encode(auth_bytes).decode('ascii')
+            url = self._site_url.format(sid=site_id)
             
-            headers = {
-                'Authorization': f'Basic {auth_header}',
-                'Content-Type': 'application/json',
-                'User-Agent': 'Duda-Billing-Control/1.0'
-            }
-            
-            if self.debug_mode:
+            if debug:
                 st.write(f"🔍 **Debug - Site Status für {site_id}:**")
                 st.write(f"URL: {url}")
             
+            # Publishing-Historie spekulativ parallel zu den Site-Details abrufen - bei 403/404 wird
+            # das Ergebnis verworfen (kostet dann einen zusätzlichen Activities-Call)
+            publish_future = None
+            if prefetch_activities:
+                publish_future = self._submit_with_ctx(self._activities_executor, self.get_publish_info, site_id, debug)
+            
             # API Call
-            response = requests.get(url, headers=headers, timeout=15)
+            response = self._api_get(url, timeout=15)
+            error_text = self._read_error_snippet(response) if response.status_code != 200 else ''
             
-            if self.debug_mode:
+            if debug:
                 st.write(f"Response: {response.status_code}")
                 if response.status_code != 200:
-                    st.write(f"Error: {response.text[:200]}")
+                    st.write(f"Error: {error_text[:200]}")
+            
+            if response.status_code != 200 and publish_future is not None:
+                # Historie wird nur für erreichbare Sites benötigt
+                publish_future.cancel()
             
             if response.status_code == 200:
-                data = response.json()
-                
-                # Zusätzlich Publishing-Historie abrufen
-                publish_info = self.get_publish_info(site_id)
+                data = orjson.loads(response.content)
+                # Ohne spekulativen Abruf erst jetzt (nach dem 200) abrufen
+                publish_info = publish_future.result() if publish_future is not None else self.get_publish_info(site_id, debug)
+                # Ohne Activities: leere Historie (Site gilt nicht als offline)
+                publish_info = publish_info or EMPTY_PUBLISH_INFO
                 
                 return {
                     'is_published': data.get('publish_status') == 'PUBLISHED',
                     'publish_status': data.get('publish_status', 'unknown'),
                     'last_published': data.get('last_published_date'),
                     'first_published': data.get('first_published_date'),
-                    'unpublication_date': publish_info.get('last_unpublish_date') if publish_info else None,  # Aus Activities!
+                    'unpublication_date': publish_info.last_unpublish_date,  # Aus Activities!
                     'site_status': data.get('site_status', 'unknown'),
-                    'publish_history': publish_info.get('history', []) if publish_info else [],
+                    'publish_history': publish_info.history,
                     'site_domain': data.get('site_domain', ''),
                     'fqdn': data.get('fqdn', ''),
                     'preview_url': data.get('preview_site_url', ''),
                     'api_response_code': response.status_code,
                     'creation_date': data.get('creation_date'),
                     'modification_date': data.get('modification_date'),
-                    'is_currently_offline': publish_info.get('is_currently_offline', False) if publish_info else False
+                    'is_currently_offline': publish_info.is_currently_offline,
+                    'days_offline': publish_info.days_since_unpublish
                 }
             elif response.status_code == 404:
                 return {
@@ -205,7 +388,7 @@ class DudaAPIVerifier:
                     'api_response_code': response.status_code,
                     'is_published': False,
                     'details': self._interpret_error_code(response.status_code),
-                    'response_text': response.text[:200]
+                    'response_text': error_text[:200]
                 }
                 
         except requests.exceptions.Timeout:
@@ -213,39 +396,33 @@ class DudaAPIVerifier:
         except Exception as e:
             return {'error': str(e), 'api_response_code': 500}
     
-    def get_publish_info(self, site_id):
+    def get_activities(self, site_id, limit=50):
+        """Ruft die Activities einer Site ab (Roh-Response, über die geteilte Session)"""
+        # API Endpoint für Site Activities
+        params = {
+            'limit': limit,
+            'offset': 0
+        }
+        
+        return self._api_get(self._activities_url.format(sid=site_id), params=params, timeout=10)
+    
+    def get_publish_info(self, site_id, debug=None):
         """Holt die Publishing-Informationen einer Site und bestimmt den aktuellen Status"""
         if not self.api_available:
             return None
+        
+        debug = self.debug_mode if debug is None else debug
             
         try:
-            # API Endpoint für Site Activities
-            url = f"{self.api_endpoint}/api/sites/multiscreen/{site_id}/activities"
-            
-            auth_string = f"{self.api_username}:{self.api_password}"
-            auth_bytes = auth_string.encode('ascii')
-            auth_header = base64.b64encode(auth_bytes).decode('ascii')
-            
-            headers = {
-                'Authorization': f'Basic {auth_header}',
-                'Content-Type': 'application/json',
-                'User-Agent': 'Duda-Billing-Control/1.0'
-            }
-            
             # Nur die letzten 50 Aktivitäten abrufen
-            params = {
-                'limit': 50,
-                'offset': 0
-            }
-            
-            response = requests.get(url, headers=headers, params=params, timeout=10)
+            response = self.get_activities(site_id, limit=50)
             
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 # WICHTIG: Activities sind im 'results' Array!
                 activities = data.get('results', [])
                 
-                if self.debug_mode:
+                if debug:
                     st.write(f"📋 Gefundene Activities für {site_id}: {len(activities)}")
                 
                 # Neueste unpublish und publish Daten finden
@@ -260,7 +437,7 @@ class DudaAPIVerifier:
                     activity_date = activity.get('date')
                     
                     # Nur publish/unpublish Activities verarbeiten
-                    if 'publish' in activity_type and activity_date:
+                    if activity_type in PUBLISH_ACTIVITY_TYPES and activity_date:
                         activity_info = {
                             'type': activity_type,
                             'date': activity_date,
@@ -285,7 +462,7 @@ class DudaAPIVerifier:
                         if last_unpublish_date and last_publish_date:
                             break
                 
-                if self.debug_mode and (last_unpublish_date or last_publish_date):
+                if debug and (last_unpublish_date or last_publish_date):
                     st.write(f"📅 Letztes Unpublish: {last_unpublish_date}")
                     st.write(f"📅 Letztes Publish: {last_publish_date}")
                 
@@ -299,21 +476,24 @@ class DudaAPIVerifier:
                         # Unpublish ist neuer als publish
                         is_currently_offline = True
                 
-                return {
-                    'last_unpublish_date': last_unpublish_date,
-                    'last_unpublish_info': last_unpublish_info,
-                    'last_publish_date': last_publish_date,
-                    'last_publish_info': last_publish_info,
-                    'is_currently_offline': is_currently_offline,
-                    'history': publish_history
-                }
+                return PublishInfo(
+                    last_unpublish_date=last_unpublish_date,
+                    last_unpublish_info=last_unpublish_info,
+                    last_publish_date=last_publish_date,
+                    last_publish_info=last_publish_info,
+                    is_currently_offline=is_currently_offline,
+                    # Einmal pro Site berechnen statt bei jeder Analyse erneut zu parsen
+                    days_since_unpublish=days_since_date(last_unpublish_date) if last_unpublish_date else None,
+                    history=publish_history
+                )
             else:
-                if self.debug_mode:
+                response.close()
+                if debug:
                     st.write(f"❌ Activities API Error: {response.status_code}")
                 return None
                 
         except Exception as e:
-            if self.debug_mode:
+            if debug:
                 st.write(f"❌ Activities Exception: {str(e)}")
             return None
     
@@ -350,8 +530,8 @@ class DudaAPIVerifier:
                 'recommendation': 'Verrechnung berechtigt - Site ist wieder online'
             }
         
-        # Prüfe wann die Site zuletzt unpublished wurde
-        days_offline = days_since_date(unpublish_date) if unpublish_date else None
+        # Tage seit dem letzten Unpublish (bereits beim Abruf der Activities berechnet)
+        days_offline = api_result.get('days_offline')
         
         # Kalendermonat-Regel anwenden (≤31 Tage)
         if days_offline is not None and days_offline <= 31:
@@ -372,18 +552,72 @@ class DudaAPIVerifier:
             'unpublish_date': unpublish_date
         }
     
+    def _submit_with_ctx(self, executor, fn, *args):
+        """Übergibt fn an einen Executor inkl. Streamlit-Kontext (für Debug-Ausgaben)"""
+        ctx = get_script_run_ctx()
+        
+        def run():
+            thread = threading.current_thread()
+            previous_ctx = get_script_run_ctx(suppress_warning=True)
+            add_script_run_ctx(thread, ctx)
+            try:
+                return fn(*args)
+            finally:
+                # Kontext wieder lösen - der Activities-Pool lebt mit dem geteilten Verifier weiter
+                setattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, previous_ctx)
+        
+        return executor.submit(run)
+    
+    def _get_site_status_guarded(self, site_id, circuit_breaker):
+        """Wie get_site_status, aber ohne API Call sobald der Auth-Circuit-Breaker offen ist"""
+        if circuit_breaker.is_open():
+            return {
+                'error': AUTH_CIRCUIT_OPEN_ERROR,
+                'api_response_code': 401,
+                'details': _ERROR_EXPLANATIONS[401]
+            }
+        
+        result = self.get_site_status(site_id)
+        circuit_breaker.record(result.get('api_response_code') if result else None)
+        return result
+    
+    def _fetch_site_statuses(self, site_ids, progress_bar=None, status_text=None):
+        """Holt den Status mehrerer Sites parallel (begrenzt auf max_parallel_requests)"""
+        results = {}
+        if not site_ids:
+            return results
+        
+        # Eigener Circuit Breaker pro Lauf - der Verifier wird zwischen Sessions geteilt
+        circuit_breaker = AuthCircuitBreaker()
+        
+        with ThreadPoolExecutor(max_workers=self.max_parallel_requests) as executor:
+            futures = {
+                self._submit_with_ctx(executor, self._get_site_status_guarded, site_id, circuit_breaker): site_id
+                for site_id in site_ids
+            }
+            
+            for done, future in enumerate(as_completed(futures), start=1):
+                site_id = futures[future]
+                try:
+                    results[site_id] = future.result()
+                except Exception as e:
+                    results[site_id] = {'error': str(e), 'api_response_code': 500}
+                
+                # Progress Update
+                if progress_bar is not None:
+                    progress_bar.progress(done / len(site_ids))
+                if status_text is not None:
+                    status_text.text(f"Prüfe Site {done}/{len(site_ids)}: {site_id}")
+        
+        return results
+    
     def verify_issues(self, issues_df):
         """Finale Verifikation der problematischen Sites über Duda API"""
         if not self.api_available or issues_df.empty:
             return issues_df, [], []
         
-        verified_issues = []
-        false_positives = []
-        api_errors = []
-        api_calls_made = 0
-        
-        # Cache für API-Ergebnisse (Site-ID → Result)
-        api_cache = {}
+        # Jede Site-ID nur einmal abfragen (Apps teilen sich die ID mit der Lizenz)
+        site_ids = issues_df['Site_Alias'].unique().tolist()
         
         st.info(f"🔍 Finale Verifikation von {len(issues_df)} problematischen Sites über Duda API...")
         
@@ -391,82 +625,71 @@ class DudaAPIVerifier:
         progress_bar = st.progress(0)
         status_text = st.empty()
         
-        for idx, (_, issue) in enumerate(issues_df.iterrows()):
-            site_id = issue['Site_Alias']
-            product_type = issue.get('Produkttyp', '')
-            
-            # Progress Update
-            progress = (idx + 1) / len(issues_df)
-            progress_bar.progress(progress)
-            status_text.text(f"Prüfe Site {idx + 1}/{len(issues_df)}: {site_id} ({product_type})")
-            
-            # API Call (mit Cache)
-            cache_key = site_id  # Verwende nur Site-ID als Cache-Key
-            
-            if cache_key in api_cache:
-                api_result = api_cache[cache_key]
-                if self.debug_mode:
-                    st.write(f"📋 Cache-Treffer für {site_id}")
-            else:
-                api_result = self.get_site_status(site_id)
-                api_cache[cache_key] = api_result
-                api_calls_made += 1
-                
-                # Kleine Pause um API nicht zu überlasten
-                if api_calls_made > 1:
-                    time.sleep(0.2)
-            
-            # Für Apps: Wenn die Site selbst keine Activities hat, ist das normal
-            # Apps teilen sich die Site-ID mit der Lizenz, haben aber keine eigenen Activities
-            if is_app_product(product_type) and api_result and 'error' not in api_result:
-                # Das Unpublish-Datum sollte bereits von der Lizenz im Cache sein
-                if self.debug_mode:
-                    st.write(f"📱 App {product_type} verwendet Daten der Lizenz-Site {site_id}")
-            
-            # Ergebnis analysieren
-            analysis = self.analyze_api_result(site_id, api_result, issue)
+        # API Calls parallel ausführen (I/O-bound, daher Threads statt Prozesse)
+        api_results = self._fetch_site_statuses(site_ids, progress_bar, status_text)
+        skipped_auth = sum(1 for r in api_results.values() if r and r.get('error') == AUTH_CIRCUIT_OPEN_ERROR)
+        api_calls_made = len(api_results) - skipped_auth
+        
+        # Analyse einmal pro Site statt pro Issue-Zeile (Apps teilen das Ergebnis der Lizenz)
+        api_records = []
+        for site_id, api_result in api_results.items():
+            analysis = self.analyze_api_result(site_id, api_result, None)
             
-            # Angereicherte Issue-Daten erstellen
-            enriched_issue = issue.copy()
-            if api_result and 'error' not in api_result:
-                enriched_issue['API_Published'] = api_result.get('is_published', False)
-                enriched_issue['API_Last_Published'] = api_result.get('last_published', '')
-                enriched_issue['API_Unpublish_Date'] = analysis.get('unpublish_date', api_result.get('unpublication_date', ''))
-                enriched_issue['API_Site_Domain'] = api_result.get('site_domain', '')
-                enriched_issue['API_Currently_Offline'] = api_result.get('is_currently_offline', 'Unknown')
+            is_error = not api_result or 'error' in api_result
+            if not is_error:
+                record = {
+                    'API_Published': api_result.get('is_published', False),
+                    'API_Last_Published': api_result.get('last_published', ''),
+                    'API_Unpublish_Date': analysis.get('unpublish_date', api_result.get('unpublication_date', '')),
+                    'API_Site_Domain': api_result.get('site_domain', ''),
+                    'API_Currently_Offline': api_result.get('is_currently_offline', 'Unknown')
+                }
             else:
-                enriched_issue['API_Published'] = 'ERROR'
-                enriched_issue['API_Last_Published'] = ''
-                enriched_issue['API_Unpublish_Date'] = ''
-                enriched_issue['API_Site_Domain'] = ''
-                enriched_issue['API_Currently_Offline'] = 'ERROR'
-                enriched_issue['API_Error_Details'] = api_result.get('details', '') if api_result else ''
-            
-            enriched_issue['API_Analysis'] = analysis['reason']
-            enriched_issue['API_Recommendation'] = analysis['recommendation']
+                record = {
+                    'API_Published': 'ERROR',
+                    'API_Last_Published': '',
+                    'API_Unpublish_Date': '',
+                    'API_Site_Domain': '',
+                    'API_Currently_Offline': 'ERROR'
+                }
             
-            # Klassifikation
-            if analysis['classification'] == 'false_positive':
-                false_positives.append(enriched_issue)
-            elif analysis['classification'] == 'api_error':
-                api_errors.append(enriched_issue)
-                verified_issues.append(enriched_issue)  # Bei API-Fehlern: Issue beibehalten
-            else:  # confirmed_issue
-                verified_issues.append(enriched_issue)
+            record['Site_Alias'] = site_id
+            record['API_Analysis'] = analysis['reason']
+            record['API_Recommendation'] = analysis['recommendation']
+            record['API_Classification'] = analysis['classification']
+            # Fehlerdetails zuletzt - Spaltenreihenfolge unabhängig davon welche Site zuerst fertig wird
+            if is_error:
+                record['API_Error_Details'] = api_result.get('details', '') if api_result else ''
+            api_records.append(record)
+        
+        # Ergebnisse in einem Schritt an die Issues joinen (Index der Issues bleibt erhalten)
+        api_df = pd.DataFrame.from_records(api_records).set_index('Site_Alias')
+        enriched = issues_df.join(api_df, on='Site_Alias')
+        
+        # Klassifikation über Masken - bei API-Fehlern bleibt das Issue erhalten
+        classification = enriched.pop('API_Classification')
+        fp_mask = classification == 'false_positive'
+        error_mask = classification == 'api_error'
+        
+        verified_df = enriched[~fp_mask]
+        false_positives = enriched[fp_mask].drop(columns='API_Error_Details', errors='ignore').to_dict('records')
+        api_errors = enriched[error_mask].to_dict('records')
         
         progress_bar.empty()
         status_text.empty()
         
         # Zusammenfassung
         st.success(f"✅ API Verifikation abgeschlossen:")
+        if skipped_auth:
+            st.error(f"🔒 {AUTH_CB_THRESHOLD} Authentifizierungsfehler in Folge - {skipped_auth} Sites wurden ohne API Call übersprungen. Bitte API Credentials prüfen!")
         col1, col2, col3, col4 = st.columns(4)
         with col1:
             st.metric("API Calls", api_calls_made)
         with col2:
             st.metric("False Positives", len(false_positives))
         with col3:
-            st.metric("Echte Probleme", len(verified_issues) - len(api_errors))
+            st.metric("Echte Probleme", len(verified_df) - len(api_errors))
         with col4:
             st.metric("API Fehler", len(api_errors))
         
-        return pd.DataFrame(verified_issues), false_positives, api_errors
+        return verified_df, false_positives, api_errors
@@ -5,11 +5,24 @@ Modulare Version v25 - Mit Skyline CRM Integration
 
 import streamlit as st
 import pandas as pd
+import threading
+import time
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from streamlit.runtime.scriptrunner_utils.script_run_context import SCRIPT_RUN_CONTEXT_ATTR_NAME
 from file_processor import FileProcessor
 from data_analyzer import DataAnalyzer
-from api_verifier import DudaAPIVerifier
-from report_generator import ReportGenerator
-from utils import extract_domain
+from utils import extract_domain, select_available_columns, categorize_charge_frequencies
+
+# Issue-Spalten mit wenigen verschiedenen Werten (werden als Kategorie gespeichert)
+CATEGORY_ISSUE_COLUMNS = ('Problem_Typ', 'Produkttyp', 'CRM_Status')
+
+# Maximale Anzahl Zeilen pro Seite in der Problemtabelle
+ISSUES_PAGE_SIZE = 500
+
+# Vorab gestartete API-Verbindungstests sind nur so lange gültig (Sekunden)
+API_TEST_PREFETCH_MAX_AGE = 60
 
 
 def main():
@@ -34,6 +47,69 @@ def main():
         display_api_debug()
 
 
+@st.cache_resource
+def get_verifier():
+    """Liefert einen geteilten DudaAPIVerifier (Session und Cache bleiben über Reruns erhalten)"""
+    # Erst bei Bedarf importieren (requests, urllib3, orjson)
+    from api_verifier import DudaAPIVerifier
+    return DudaAPIVerifier()
+
+
+@st.cache_resource
+def get_report_generator():
+    """Liefert einen geteilten ReportGenerator (zustandslos - muss nicht pro Rerun neu erstellt werden)"""
+    from report_generator import ReportGenerator
+    return ReportGenerator()
+
+
+@st.cache_data(show_spinner=False)
+def load_duda_data(raw_bytes):
+    """Lädt die Duda-Rechnung (gecacht über den Dateiinhalt - kein erneutes Parsen bei Reruns)"""
+    return FileProcessor().load_duda_file(BytesIO(raw_bytes))
+
+
+@st.cache_data(show_spinner=False)
+def load_crm_data(raw_bytes):
+    """Lädt den CRM Export (gecacht über den Dateiinhalt - kein erneutes Parsen bei Reruns)"""
+    return FileProcessor().load_crm_file(BytesIO(raw_bytes))
+
+
+@st.cache_data(show_spinner=False, ttl=3600)
+def analyze_data(duda_df, crm_df):
+    """Führt die Datenanalyse durch (gecacht - Widget-Klicks lösen keine neue Analyse aus)"""
+    # TTL, weil die Kalendermonat-Regel vom aktuellen Datum abhängt
+    analyzer = DataAnalyzer(duda_df, crm_df)
+    issues = analyzer.find_issues()
+    
+    # Spalten mit wenigen Werten als Kategorie - Filter vergleichen Codes statt Strings und
+    # st.dataframe überträgt weniger Daten (assign, damit das gecachte Analyzer-Ergebnis unverändert bleibt)
+    category_columns = [col for col in CATEGORY_ISSUE_COLUMNS if col in issues.columns]
+    if category_columns:
+        issues = issues.assign(**{col: issues[col].astype('category') for col in category_columns})
+    
+    return issues, analyzer.get_summary(), group_problem_type_rows(issues)
+
+
+def group_problem_type_rows(issues):
+    """Zeilenpositionen je Problemtyp in einem groupby-Durchlauf (sortiert nach Kategorie, nur vorhandene Typen)"""
+    if issues.empty:
+        return {}
+    return issues.groupby('Problem_Typ', observed=True).indices
+
+
+@st.cache_data(show_spinner=False)
+def build_breakdown_df(product_breakdown):
+    """Erstellt die Breakdown-Tabelle nach Produkttyp (gecacht über den Breakdown-Inhalt)"""
+    return pd.DataFrame(get_report_generator().format_product_breakdown(product_breakdown))
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def build_csv_report(issues_df, summary, api_results, report_timestamp):
+    """Erstellt den Haupt-Bericht (gecacht - Reruns in derselben Minute serialisieren nicht erneut)"""
+    # report_timestamp nur als Cache-Schlüssel: Datum im Bericht passt so zum Dateinamen
+    return get_report_generator().generate_csv_report(issues_df, summary, api_results)
+
+
 def get_app_version():
     """Liest die Versionsnummer aus der version.txt Datei"""
     try:
@@ -101,24 +177,32 @@ def display_main_app():
     # Main Content
     if duda_file is not None and crm_file is not None:
         try:
-            # Dateien verarbeiten
+            duda_bytes = duda_file.getvalue()
+            crm_bytes = crm_file.getvalue()
+            data_key = (hash(duda_bytes), hash(crm_bytes))
+            
+            # Laden und Analyse bei jedem Rerun über st.cache_data - so werden die Hinweise der Loader
+            # erneut angezeigt und die TTL der Analyse (Kalendermonat-Regel) greift
             with st.spinner("Dateien werden verarbeitet..."):
-                processor = FileProcessor()
+                # CRM Daten im Hintergrund laden, während hier die Duda Rechnung geladen wird
+                crm_future = run_in_background(get_file_executor(), load_crm_data, crm_bytes)
                 
                 # Duda Rechnung laden
-                duda_df = processor.load_duda_file(duda_file)
+                duda_df = load_duda_data(duda_bytes)
                 
-                # CRM Daten laden
-                crm_df = processor.load_crm_file(crm_file)
+                crm_df = crm_future.result()
             
             # Datenanalyse
             with st.spinner("Daten werden analysiert..."):
-                analyzer = DataAnalyzer(duda_df, crm_df)
-                issues = analyzer.find_issues()
-                summary = analyzer.get_summary()
+                issues, summary, problem_type_rows = analyze_data(duda_df, crm_df)
+            
+            # Eine frühere API-Verifikation gehört zu anderen Dateien
+            if st.session_state.get('data_key') != data_key:
+                st.session_state['data_key'] = data_key
+                st.session_state['api_verification_done'] = False
             
             # Ergebnisse anzeigen
-            display_results(issues, summary, duda_df, crm_df)
+            display_results(issues, summary, duda_df, crm_df, problem_type_rows)
             
         except Exception as e:
             st.error(f"Fehler beim Verarbeiten der Dateien: {str(e)}")
@@ -152,13 +236,43 @@ def display_main_app():
             """)
 
 
+@st.cache_resource
+def get_background_executor():
+    """Gemeinsamer Thread-Pool für Hintergrund-Abfragen (z.B. API-Verbindungstest vorab)"""
+    return ThreadPoolExecutor(max_workers=2)
+
+
+@st.cache_resource
+def get_file_executor():
+    """Eigener Thread-Pool für das Laden der Dateien (langsame API-Abfragen blockieren den Upload nicht)"""
+    return ThreadPoolExecutor(max_workers=4)
+
+
+def run_in_background(executor, fn, *args):
+    """Führt fn im angegebenen Pool aus - mit Streamlit-Kontext, damit st.* Ausgaben und Caches funktionieren"""
+    ctx = get_script_run_ctx()
+    
+    def run():
+        thread = threading.current_thread()
+        previous_ctx = get_script_run_ctx(suppress_warning=True)
+        add_script_run_ctx(thread, ctx)
+        try:
+            return fn(*args)
+        finally:
+            # Kontext wieder lösen - Pool-Threads halten sonst den Kontext einer beendeten Session
+            setattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, previous_ctx)
+    
+    return executor.submit(run)
+
+
+@st.fragment
 def display_api_debug():
-    """Zeigt den API Debug Bereich an"""
+    """Zeigt den API Debug Bereich an (Fragment - Klicks rerunnen nicht die Rechnungskontrolle)"""
     st.header("🧪 API Debug Tool")
     st.markdown("Teste einzelne Sites ohne CSV-Upload")
     
-    # API Verifier initialisieren
-    verifier = DudaAPIVerifier()
+    # API Verifier (gecacht über Reruns)
+    verifier = get_verifier()
     
     # API Status
     if verifier.api_available:
@@ -172,21 +286,98 @@ def display_api_debug():
         st.error("❌ API nicht konfiguriert")
         st.stop()
     
-    # Einzelne Site testen
-    st.subheader("🔍 Einzelne Site testen")
+    # Verbindungstest nur auf Wunsch vorab im Hintergrund starten - Ergebnis liegt beim Klick meist schon vor
+    st.checkbox("Verbindungstest vorab im Hintergrund starten", key="api_test_prefetch")
+    if st.session_state.get('api_test_prefetch') and 'api_test_future' not in st.session_state:
+        st.session_state['api_test_future'] = (
+            time.monotonic(),
+            get_background_executor().submit(verifier.test_api_connection, debug=False)
+        )
     
-    col1, col2 = st.columns([3, 1])
+    if st.button("🔌 API-Verbindung testen", key="debug_api_test"):
+        prefetched = st.session_state.pop('api_test_future', None)
+        with st.spinner("Teste API-Verbindung..."):
+            try:
+                # Zu alte Vorab-Ergebnisse verwerfen und neu testen
+                if prefetched and time.monotonic() - prefetched[0] <= API_TEST_PREFETCH_MAX_AGE:
+                    api_test = prefetched[1].result(timeout=12)
+                else:
+                    if prefetched:
+                        prefetched[1].cancel()
+                    api_test = verifier.test_api_connection(debug=False)
+            except Exception as e:
+                api_test = {'success': False, 'error': 'API Test fehlgeschlagen', 'details': str(e)}
+        
+        if api_test['success']:
+            st.success(f"✅ API funktioniert! Test-Site: {api_test.get('site_domain', 'OK')}")
+        else:
+            st.error(f"❌ API-Problem: {api_test['error']}")
+            if 'details' in api_test:
+                st.warning(api_test['details'])
     
-    with col1:
-        test_site_id = st.text_input(
-            "Site-ID eingeben:",
-            placeholder="z.B. dfc0dce1",
-            help="Gib eine Site-ID ein um detaillierte API-Informationen zu erhalten"
-        )
+    # Einzelne Site testen (als Fragment - Klicks rerunnen nur diesen Bereich)
+    display_site_test(verifier)
     
-    with col2:
-        st.write("")  # Spacing
-        test_button = st.button("🚀 Site testen", type="primary", use_container_width=True)
+    # API-Tipps
+    st.markdown("---")
+    st.subheader("💡 Debug-Tipps")
+    
+    with st.expander("🔧 Häufige Probleme"):
+        st.markdown("""
+        **Keine Unpublication Date:**
+        - Viele Sites haben kein `unpublication_date` im Site-Details-Endpoint
+        - Suche nach `site_unpublished` Activities in der Publishing-Historie
+        - Manche sehr alte Sites haben keine Activity-Historie
+        
+        **403/404 Fehler:**
+        - Site gehört nicht zu deinem Account
+        - Site wurde gelöscht oder archiviert
+        - API-Berechtigung unvollständig
+        
+        **Leere Activity-Liste:**
+        - Enterprise-Accounts haben manchmal andere Activity-Zugriffe
+        - Site ist sehr neu (keine Historie)
+        - Activities werden nicht für alle Sites gespeichert
+        """)
+    
+    with st.expander("🧪 Debug-Mode aktivieren"):
+        st.markdown("""
+        Für detaillierte Debug-Ausgaben, setze in deinen Streamlit Secrets:
+        
+        ```toml
+        [duda]
+        api_username = "06d7b49e90"
+        api_password = "DEIN_PASSWORD"
+        api_endpoint = "https://api.duda.co"
+        debug_mode = true
+        max_parallel_requests = 8  # optional, gleichzeitige API-Anfragen
+        status_cache_ttl = 300  # optional, Sekunden bis Site-Status neu abgefragt wird
+        ```
+        """)
+
+
+@st.fragment
+def display_site_test(verifier):
+    """Zeigt den Einzel-Site-Test des API Debug Bereichs an"""
+    st.subheader("🔍 Einzelne Site testen")
+    
+    # Formular: Eingabe löst erst beim Absenden einen Rerun aus (nicht pro Tastendruck)
+    with st.form("site_test"):
+        col1, col2 = st.columns([3, 1])
+        
+        with col1:
+            site_id_input = st.text_input(
+                "Site-ID eingeben:",
+                placeholder="z.B. dfc0dce1",
+                help="Gib eine Site-ID ein um detaillierte API-Informationen zu erhalten"
+            )
+        
+        with col2:
+            st.write("")  # Spacing
+            submitted = st.form_submit_button("🚀 Site testen", type="primary", use_container_width=True)
+    
+    # Site-ID deren Status in diesem Lauf abgefragt wird (nur nach Absenden oder Beispiel-Klick)
+    fetch_site_id = site_id_input.strip() if submitted and site_id_input.strip() else None
     
     # Beispiel-IDs
     st.markdown("**Beispiel-IDs zum Testen:**")
@@ -196,24 +387,28 @@ def display_api_debug():
     for i, example_id in enumerate(example_ids):
         with cols[i]:
             if st.button(f"`{example_id}`", key=f"example_{i}"):
-                test_site_id = example_id
-                test_button = True
+                fetch_site_id = example_id
+    
+    if fetch_site_id:
+        st.session_state['last_site_id'] = fetch_site_id
+        st.session_state.pop('last_site_result', None)
+    
+    # Zuletzt bestätigte Site-ID bleibt über Reruns erhalten (z.B. für Activities-Button)
+    test_site_id = st.session_state.get('last_site_id')
     
     # Site testen
-    if test_site_id and test_button:
+    if test_site_id:
         st.markdown("---")
         st.subheader(f"📋 Testergebnisse für Site: `{test_site_id}`")
         
-        with st.spinner(f"Teste Site {test_site_id}..."):
-            # Debug-Modus temporär aktivieren für detaillierte Ausgabe
-            original_debug = verifier.debug_mode
-            verifier.debug_mode = True
-            
-            # API Call
-            result = verifier.get_site_status(test_site_id)
-            
-            # Debug-Modus zurücksetzen
-            verifier.debug_mode = original_debug
+        if fetch_site_id:
+            with st.spinner(f"Teste Site {test_site_id}..."):
+                # API Call mit detaillierter Debug-Ausgabe (ohne den geteilten Verifier zu verändern)
+                result = verifier.get_site_status(test_site_id, debug=True)
+            st.session_state['last_site_result'] = result
+        else:
+            # Bei anderen Reruns kein erneuter API Call - gespeichertes Ergebnis anzeigen
+            result = st.session_state.get('last_site_result')
         
         # Zusätzliche Ergebnis-Analyse
         st.markdown("---")
@@ -238,20 +433,9 @@ def display_api_debug():
             st.subheader("📅 Activities API Test")
             
             if st.button("🔍 Activities abrufen", key="get_activities"):
-                activities_url = f"{verifier.api_endpoint}/api/sites/multiscreen/{test_site_id}/activities"
-                
-                auth_string = f"{verifier.api_username}:{verifier.api_password}"
-                auth_bytes = auth_string.encode('ascii')
-                auth_header = base64.b64encode(auth_bytes).decode('ascii')
-                
-                headers = {
-                    'Authorization': f'Basic {auth_header}',
-                    'Content-Type': 'application/json'
-                }
-                
+                # Geteilte Session des Verifiers (Auth-Header vorberechnet, Verbindung wiederverwendet)
                 with st.spinner("Rufe Activities ab..."):
-                    import requests
-                    activities_response = requests.get(activities_url, headers=headers, params={'limit': 20})
+                    activities_response = verifier.get_activities(test_site_id, limit=20)
                 
                 if activities_response.status_code == 200:
                     activities_data = activities_response.json()
@@ -300,24 +484,18 @@ def display_api_debug():
                     st.error(f"❌ Activities API Error: {activities_response.status_code}")
                     st.text(activities_response.text)
             
-            # Publishing History falls vorhanden
+            # Publishing History falls vorhanden (max. 10 Einträge - direkt als Tabelle)
             if result.get('publish_history'):
                 st.subheader("📅 Publishing History")
-                
-                history_data = []
-                for activity in result['publish_history']:
-                    history_data.append({
-                        'Activity': activity.get('activity_type', 'Unknown'),
+                st.table([
+                    {
+                        'Activity': activity.get('type', 'Unknown'),
                         'Date': activity.get('date', 'No date'),
                         'User': activity.get('user', 'System'),
                         'Description': activity.get('description', '')
-                    })
-                
-                if history_data:
-                    history_df = pd.DataFrame(history_data)
-                    st.dataframe(history_df, use_container_width=True, hide_index=True)
-                else:
-                    st.info("Keine Publishing-Historie verfügbar")
+                    }
+                    for activity in result['publish_history']
+                ])
             
             # Raw API Response
             with st.expander("🔧 Raw API Response"):
@@ -333,41 +511,6 @@ def display_api_debug():
         
         else:
             st.error("❌ Keine Antwort von der API erhalten")
-    
-    # API-Tipps
-    st.markdown("---")
-    st.subheader("💡 Debug-Tipps")
-    
-    with st.expander("🔧 Häufige Probleme"):
-        st.markdown("""
-        **Keine Unpublication Date:**
-        - Viele Sites haben kein `unpublication_date` im Site-Details-Endpoint
-        - Suche nach `site_unpublished` Activities in der Publishing-Historie
-        - Manche sehr alte Sites haben keine Activity-Historie
-        
-        **403/404 Fehler:**
-        - Site gehört nicht zu deinem Account
-        - Site wurde gelöscht oder archiviert
-        - API-Berechtigung unvollständig
-        
-        **Leere Activity-Liste:**
-        - Enterprise-Accounts haben manchmal andere Activity-Zugriffe
-        - Site ist sehr neu (keine Historie)
-        - Activities werden nicht für alle Sites gespeichert
-        """)
-    
-    with st.expander("🧪 Debug-Mode aktivieren"):
-        st.markdown("""
-        Für detaillierte Debug-Ausgaben, setze in deinen Streamlit Secrets:
-        
-        ```toml
-        [duda]
-        api_username = "06d7b49e90"
-        api_password = "DEIN_PASSWORD"
-        api_endpoint = "https://api.duda.co"
-        debug_mode = true
-        ```
-        """)
 
 
 def create_domain_mapping(duda_df):
@@ -376,11 +519,12 @@ def create_domain_mapping(duda_df):
     domain_mapping = {}
     
     # Filtere nach Lizenzen und Shops (haben eigene Domains)
-    primary_sites = duda_df[duda_df['Produkttyp'].isin(['Lizenz', 'Shop'])].copy()
+    primary_sites = duda_df[duda_df['Produkttyp'].isin(['Lizenz', 'Shop'])]
+    site_urls = primary_sites['Site URL'] if 'Site URL' in primary_sites.columns else [''] * len(primary_sites)
     
-    for _, site in primary_sites.iterrows():
-        site_id = str(site['Site Alias']).strip()
-        site_url = site.get('Site URL', '')
+    # Nur die zwei benötigten Spalten durchlaufen - keine Series pro Zeile wie bei iterrows
+    for site_id, site_url in zip(primary_sites['Site Alias'], site_urls):
+        site_id = str(site_id).strip()
         
         # Domain extrahieren
         if site_url and site_url != 'nan':
@@ -396,9 +540,8 @@ def enrich_sites_with_domains(duda_df):
     
     # Produkttyp-Spalte hinzufügen falls sie nicht existiert
     if 'Produkttyp' not in duda_df.columns:
-        from utils import categorize_charge_frequency
         duda_df = duda_df.copy()
-        duda_df['Produkttyp'] = duda_df['Charge Frequency'].apply(categorize_charge_frequency)
+        duda_df['Produkttyp'] = categorize_charge_frequencies(duda_df['Charge Frequency'])
     
     # Domain-Mapping erstellen
     domain_mapping = create_domain_mapping(duda_df)
@@ -406,8 +549,9 @@ def enrich_sites_with_domains(duda_df):
     # Alle Sites durchgehen und Domains zuweisen
     enriched_sites = []
     
-    for _, site in duda_df.iterrows():
-        site_dict = site.to_dict()
+    # Zeilen direkt als Dicts - spart die Series pro Zeile von iterrows
+    for site in duda_df.to_dict('records'):
+        site_dict = dict(site)
         site_id = str(site['Site Alias']).strip()
         current_url = site.get('Site URL', '')
         
@@ -478,7 +622,7 @@ def display_site_overview(duda_df, issues_df):
         type_info = get_product_type_info(product_type)
         
         # Problem-Count für diesen Produkttyp
-        type_problems = len([site for site in sites_of_type['Site Alias'] if site in problem_sites])
+        type_problems = int(sites_of_type['Site Alias'].isin(problem_sites).sum())
         ok_count = len(sites_of_type) - type_problems
         
         # Akkordeon-Header mit Status-Info
@@ -611,7 +755,7 @@ def prepare_sites_table(sites_df, problem_sites, show_filter, sort_by, sort_desc
     # Basis-Daten zusammenstellen
     display_data = []
     
-    for _, site in sites_df.iterrows():
+    for site in sites_df.to_dict('records'):
         site_id = site['Site Alias']
         
         # Verwende die angereicherte Domain
@@ -661,11 +805,39 @@ def prepare_sites_table(sites_df, problem_sites, show_filter, sort_by, sort_desc
     return display_df.drop('Status_Sort', axis=1)
 
 
-def display_results(issues, summary, duda_df, crm_df):
+def compute_debug_stats(duda_df, crm_df):
+    """Berechnet die Kennzahlen für den Debug-Bereich (Zeilen, IDs, Landingpages)"""
+    stats = {
+        'duda_rows': len(duda_df),
+        'duda_charged': int((duda_df['Should Charge'] == 1).sum()),
+        'crm_rows': len(crm_df),
+        'with_duda_id': int(crm_df['Site-ID-Duda'].notna().sum())
+    }
+    
+    # Landingpage-IDs prüfen falls vorhanden
+    if 'Landingpage-ID' in crm_df.columns:
+        stats['with_landingpage_id'] = int((
+            (crm_df['Landingpage-ID'].notna()) & 
+            (crm_df['Landingpage-ID'] != '') & 
+            (crm_df['Landingpage-ID'] != 'nan')
+        ).sum())
+        
+        # Gesamtanzahl einzigartiger IDs - beide Spalten in einem Durchgang bereinigen und zählen
+        all_ids = pd.concat(
+            [crm_df['Site-ID-Duda'].astype(object), crm_df['Landingpage-ID']], ignore_index=True
+        ).dropna().astype(str).str.strip()
+        stats['unique_id_count'] = all_ids[(all_ids != '') & (all_ids != 'nan')].nunique()
+    
+    return stats
+
+
+def display_results(issues, summary, duda_df, crm_df, problem_type_rows):
     """Zeigt die Analyseergebnisse an"""
+    # API Verifikation für finale Kontrolle (geteilter Verifier - Session und Cache bleiben erhalten)
+    duda_verifier = get_verifier()
     
-    # API Verifikation für finale Kontrolle
-    duda_verifier = DudaAPIVerifier()
+    # Zeitstempel einmal pro Lauf für alle Download-Dateinamen
+    report_timestamp = pd.Timestamp.now().strftime('%Y%m%d_%H%M')
     
     # Zusammenfassung
     st.header("📊 Zusammenfassung")
@@ -748,9 +920,7 @@ def display_results(issues, summary, duda_df, crm_df):
     if summary['product_breakdown']:
         st.subheader("📋 Breakdown nach Produkttyp")
         
-        report_gen = ReportGenerator()
-        breakdown_list = report_gen.format_product_breakdown(summary['product_breakdown'])
-        breakdown_df = pd.DataFrame(breakdown_list)
+        breakdown_df = build_breakdown_df(summary['product_breakdown'])
         
         st.dataframe(
             breakdown_df,
@@ -778,6 +948,8 @@ def display_results(issues, summary, duda_df, crm_df):
                 
                 # API-Ergebnisse in Session State speichern
                 st.session_state['verified_issues'] = verified_issues
+                # Zeilenpositionen immer zusammen mit dem Frame speichern, zu dem sie gehören
+                st.session_state['verified_problem_type_rows'] = group_problem_type_rows(verified_issues)
                 st.session_state['false_positives'] = false_positives
                 st.session_state['api_errors'] = api_errors
                 st.session_state['api_verification_done'] = True
@@ -789,10 +961,9 @@ def display_results(issues, summary, duda_df, crm_df):
                     
                     fp_df = pd.DataFrame(false_positives)
                     display_columns = ['Site_Alias', 'Produkttyp', 'CRM_Status', 'API_Analysis', 'API_Recommendation']
-                    available_columns = [col for col in display_columns if col in fp_df.columns]
                     
                     st.dataframe(
-                        fp_df[available_columns],
+                        select_available_columns(fp_df, display_columns),
                         use_container_width=True,
                         hide_index=True,
                         column_config={
@@ -811,57 +982,83 @@ def display_results(issues, summary, duda_df, crm_df):
                     
                     error_df = pd.DataFrame(api_errors)
                     display_columns = ['Site_Alias', 'Produkttyp', 'API_Analysis']
-                    available_columns = [col for col in display_columns if col in error_df.columns]
                     
                     st.dataframe(
-                        error_df[available_columns],
+                        select_available_columns(error_df, display_columns),
                         use_container_width=True,
                         hide_index=True
                     )
                 
                 # Update issues für weitere Anzeige
                 issues = verified_issues
+                problem_type_rows = st.session_state['verified_problem_type_rows']
                 
                 if issues.empty:
                     st.success("🎉 Alle Probleme durch API-Verifikation als False Positives identifiziert!")
                     return
         
-        # Verwende Session State falls API-Verifikation bereits durchgeführt wurde
-        elif 'api_verification_done' in st.session_state and st.session_state['api_verification_done']:
-            issues = st.session_state.get('verified_issues', issues)
-            false_positives = st.session_state.get('false_positives', [])
-            api_errors = st.session_state.get('api_errors', [])
-            
-            if false_positives:
-                st.success(f"✅ {len(false_positives)} False Positives bereits eliminiert")
-            if api_errors:
-                st.warning(f"⚠️ {len(api_errors)} API-Fehler")
+            # Verwende Session State falls API-Verifikation für diese Dateien bereits durchgeführt wurde
+            elif st.session_state.get('api_verification_done'):
+                issues = st.session_state.get('verified_issues', issues)
+                problem_type_rows = st.session_state.get('verified_problem_type_rows', problem_type_rows)
+                false_positives = st.session_state.get('false_positives', [])
+                api_errors = st.session_state.get('api_errors', [])
+                
+                if false_positives:
+                    st.success(f"✅ {len(false_positives)} False Positives bereits eliminiert")
+                if api_errors:
+                    st.warning(f"⚠️ {len(api_errors)} API-Fehler")
+                
+                if issues.empty:
+                    st.success("🎉 Alle Probleme durch API-Verifikation als False Positives identifiziert!")
+                    return
         
         # Filter für Problemtyp
         if not issues.empty:
-            problem_types = issues['Problem_Typ'].unique()
+            # Filteroptionen bei jedem Lauf aus den Zeilenpositionen der aktuellen Issues - diese werden
+            # zusammen mit der (gecachten) Analyse bzw. der API-Verifikation berechnet und passen immer zum Frame
+            problem_types = tuple(problem_type_rows)
+            
             selected_type = st.selectbox(
                 "Filter nach Problemtyp:",
                 ['Alle'] + list(problem_types),
                 key="problem_filter"
             )
             
-            filtered_issues = issues if selected_type == 'Alle' else issues[issues['Problem_Typ'] == selected_type]
+            filtered_issues = issues if selected_type == 'Alle' else issues.iloc[problem_type_rows[selected_type]]
             
-            # Site ID Links für Duda Dashboard und Skyline hinzufügen
-            filtered_issues_display = filtered_issues.copy()
-            filtered_issues_display['Duda_Dashboard'] = filtered_issues_display['Site_Alias'].apply(
-                lambda x: f"https://my.duda.co/home/dashboard/overview/{x}" if pd.notna(x) and str(x).strip() else ""
-            )
-            filtered_issues_display['Skyline_Projekt'] = filtered_issues_display['Site_Alias'].apply(
-                lambda x: f"https://edelweissdigital.skylinecrm.com/projectlist?workflowfield=Duda-Site-ID={x}" if pd.notna(x) and str(x).strip() else ""
-            )
+            # Große Tabellen seitenweise anzeigen - nur die sichtbare Seite wird aufbereitet und übertragen
+            page_count = max(1, -(-len(filtered_issues) // ISSUES_PAGE_SIZE))
+            if page_count > 1:
+                page = st.number_input(
+                    f"Seite (von {page_count}, je {ISSUES_PAGE_SIZE} Einträge)",
+                    min_value=1,
+                    max_value=page_count,
+                    value=1,
+                    step=1
+                )
+                filtered_issues = filtered_issues.iloc[(page - 1) * ISSUES_PAGE_SIZE:page * ISSUES_PAGE_SIZE]
+            
+            # Site ID Links für Duda Dashboard und Skyline hinzufügen (assign statt explizitem copy)
+            site_alias = filtered_issues['Site_Alias'].astype(str)
+            has_alias = filtered_issues['Site_Alias'].notna() & (site_alias.str.strip() != '')
+            display_columns = {
+                'Duda_Dashboard': (
+                    "https://my.duda.co/home/dashboard/overview/" + site_alias
+                ).where(has_alias, ""),
+                'Skyline_Projekt': (
+                    "https://edelweissdigital.skylinecrm.com/projectlist?workflowfield=Duda-Site-ID=" + site_alias
+                ).where(has_alias, "")
+            }
             
             # Unpublish-Tage für bessere Verständlichkeit formatieren
-            if 'Unpublish_Tage' in filtered_issues_display.columns:
-                filtered_issues_display['Offline_seit'] = filtered_issues_display['Unpublish_Tage'].apply(
-                    lambda x: f"{x} Tage" if pd.notna(x) and x is not None else "Unbekannt"
-                )
+            if 'Unpublish_Tage' in filtered_issues.columns:
+                unpublish_days = filtered_issues['Unpublish_Tage']
+                display_columns['Offline_seit'] = (
+                    unpublish_days.astype(str) + " Tage"
+                ).where(unpublish_days.notna(), "Unbekannt")
+            
+            filtered_issues_display = filtered_issues.assign(**display_columns)
             
             # Spalten für Anzeige auswählen
             base_columns = {
@@ -902,7 +1099,7 @@ def display_results(issues, summary, duda_df, crm_df):
             )
         
         # Download-Buttons
-        report_gen = ReportGenerator()
+        report_gen = get_report_generator()
         
         # API-Ergebnisse für Report zusammenfassen
         api_results = None
@@ -916,22 +1113,23 @@ def display_results(issues, summary, duda_df, crm_df):
         # Download-Buttons
         col1, col2 = st.columns(2)
         
+        # Berichte erst beim Klick erzeugen - Streamlit ruft die Funktionen dann in einem eigenen Thread auf
         with col1:
-            csv_data = report_gen.generate_csv_report(issues if not issues.empty else pd.DataFrame(), summary, api_results)
+            report_issues = issues if not issues.empty else pd.DataFrame()
             st.download_button(
                 label="📥 Haupt-Bericht als CSV",
-                data=csv_data,
-                file_name=f"duda_kontrolle_{pd.Timestamp.now().strftime('%Y%m%d_%H%M')}.csv",
+                data=lambda: build_csv_report(report_issues, summary, api_results, report_timestamp),
+                file_name=f"duda_kontrolle_{report_timestamp}.csv",
                 mime="text/csv"
             )
         
         with col2:
             if 'false_positives' in st.session_state and st.session_state['false_positives']:
-                fp_report = report_gen.generate_false_positives_report(st.session_state['false_positives'])
+                fp_records = st.session_state['false_positives']
                 st.download_button(
                     label="📥 False Positives Report",
-                    data=fp_report,
-                    file_name=f"false_positives_{pd.Timestamp.now().strftime('%Y%m%d_%H%M')}.csv",
+                    data=lambda: report_gen.generate_false_positives_report(fp_records),
+                    file_name=f"false_positives_{report_timestamp}.csv",
                     mime="text/csv"
                 )
     
@@ -940,36 +1138,30 @@ def display_results(issues, summary, duda_df, crm_df):
     
     # Debug Info (ausklappbar)
     with st.expander("🔧 Debug-Informationen"):
+        # Kennzahlen nur einmal pro Datei-Paar berechnen - nicht bei jedem Widget-Klick
+        if st.session_state.get('debug_stats_key') != st.session_state.get('data_key'):
+            st.session_state['debug_stats'] = compute_debug_stats(duda_df, crm_df)
+            st.session_state['debug_stats_key'] = st.session_state.get('data_key')
+        debug_stats = st.session_state['debug_stats']
+        
         col1, col2 = st.columns(2)
         
         with col1:
             st.subheader("Duda-Daten")
-            st.text(f"Zeilen: {len(duda_df)}")
-            st.text(f"Verrechenbare: {len(duda_df[duda_df['Should Charge'] == 1])}")
+            st.text(f"Zeilen: {debug_stats['duda_rows']}")
+            st.text(f"Verrechenbare: {debug_stats['duda_charged']}")
             
         with col2:
             st.subheader("CRM-Daten")
-            st.text(f"Zeilen: {len(crm_df)}")
-            with_duda_id = len(crm_df[crm_df['Site-ID-Duda'].notna()])
-            st.text(f"Mit Standard Duda-ID: {with_duda_id}")
+            st.text(f"Zeilen: {debug_stats['crm_rows']}")
+            st.text(f"Mit Standard Duda-ID: {debug_stats['with_duda_id']}")
             
             # Landingpage-IDs prüfen falls vorhanden
-            if 'Landingpage-ID' in crm_df.columns:
-                with_landingpage_id = len(crm_df[
-                    (crm_df['Landingpage-ID'].notna()) & 
-                    (crm_df['Landingpage-ID'] != '') & 
-                    (crm_df['Landingpage-ID'] != 'nan')
-                ])
-                st.text(f"Mit Landingpage-ID: {with_landingpage_id}")
+            if 'with_landingpage_id' in debug_stats:
+                st.text(f"Mit Landingpage-ID: {debug_stats['with_landingpage_id']}")
                 
                 # Gesamtanzahl einzigartiger IDs
-                all_ids = set()
-                all_ids.update(crm_df['Site-ID-Duda'].dropna().astype(str).str.strip())
-                if 'Landingpage-ID' in crm_df.columns:
-                    landingpage_ids = crm_df['Landingpage-ID'].dropna().astype(str).str.strip()
-                    landingpage_ids = landingpage_ids[landingpage_ids != 'nan']
-                    all_ids.update(landingpage_ids)
-                st.text(f"Einzigartige IDs gesamt: {len(all_ids)}")
+                st.text(f"Einzigartige IDs gesamt: {debug_stats['unique_id_count']}")
             else:
                 st.text("Keine Landingpage-Spalte gefunden")
         
@@ -5,24 +5,27 @@ Implementiert die komplette Business-Logic für Problem-Identifikation
 
 import pandas as pd
 from file_processor import FileProcessor
-from utils import days_since_date, is_app_product, categorize_charge_frequency
+from utils import days_since_date, is_app_product, categorize_charge_frequencies
 
 
 class DataAnalyzer:
     """Klasse für die Datenanalyse und Identifikation von Problemen"""
     
     def __init__(self, duda_df, crm_df):
-        self.duda_df = duda_df.copy()
-        self.crm_df = crm_df.copy()
+        # Flache Kopien genügen: neue Spalten landen nicht im Original, Reparaturen kopieren selbst
+        self.duda_df = duda_df.copy(deep=False)
+        self.crm_df = crm_df.copy(deep=False)
         self.processor = FileProcessor()
         
         # WICHTIG: Problematische Site IDs über Domain-Abgleich reparieren
         self.duda_df = self.processor.fix_scientific_notation_ids(self.duda_df, self.crm_df)
         
-        # Produkttypen hinzufügen
-        self.duda_df['Produkttyp'] = self.duda_df['Charge Frequency'].apply(
-            categorize_charge_frequency
-        )
+        # Produkttypen hinzufügen (vektorisiert statt apply pro Zeile)
+        self.duda_df['Produkttyp'] = categorize_charge_frequencies(self.duda_df['Charge Frequency'])
+        
+        # Ergebnisse werden pro Instanz nur einmal berechnet (get_summary braucht find_issues erneut)
+        self._issues = None
+        self._summary = None
     
     def is_status_ok(self, status, unpublication_date=None):
         """Prüft ob ein Workflow-Status als OK gilt"""
@@ -44,105 +47,122 @@ class DataAnalyzer:
         
         return False
     
+    def _has_value(self, series):
+        """Maske für Einträge mit echtem Wert (nicht NaN, leer oder 'nan')"""
+        return series.notna() & ~series.astype(str).str.strip().isin(['', 'nan'])
+    
+    def _days_since(self, dates):
+        """Tage seit Datum pro Eintrag - jedes verschiedene Datum wird nur einmal geparst"""
+        days_by_date = {date: days_since_date(date) for date in dates[self._has_value(dates)].unique()}
+        return [days_by_date.get(date) for date in dates]
+    
+    def _status_masks(self, workflow_status):
+        """Vektorisierte Status-Prüfung wie in is_status_ok: (Website online, offline/gekündigt)"""
+        status = workflow_status.astype(str).str.lower()
+        online = workflow_status.notna() & status.str.contains('website online', regex=False)
+        offline = workflow_status.notna() & (
+            status.str.contains('offline', regex=False) | status.str.contains('gekündigt', regex=False)
+        )
+        return online, offline
+    
+    def _recent_mask(self, unpublish_days, index):
+        """Maske für Einträge die vor höchstens 31 Tagen unpublished wurden"""
+        days = pd.to_numeric(pd.Series(unpublish_days, index=index, dtype=object), errors='coerce')
+        return days <= 31
+    
     def find_issues(self):
-        """Findet alle problematischen Einträge"""
-        issues = []
+        """Findet alle problematischen Einträge (gecacht pro Instanz)"""
+        if self._issues is None:
+            self._issues = self._compute_issues()
+        return self._issues
+    
+    def _compute_issues(self):
+        """Ermittelt die problematischen Einträge (ein Join mit dem CRM statt Suche pro Zeile)"""
+        duda_df = self.duda_df
+        if duda_df.empty:
+            return pd.DataFrame()
         
-        for _, duda_row in self.duda_df.iterrows():
-            site_alias = str(duda_row['Site Alias']).strip()
-            unpublication_date = duda_row.get('Unpublication Date', None)
-            product_type = duda_row['Produkttyp']
-            
-            # Für Apps: Unpublication Date von zugehöriger Lizenz-Site übernehmen falls leer
-            if is_app_product(product_type) and (pd.isna(unpublication_date) or str(unpublication_date).strip() in ['', 'nan']):
-                # Suche nach Lizenz-Site mit derselben ID
-                license_match = self.duda_df[
-                    (self.duda_df['Site Alias'] == site_alias) & 
-                    (self.duda_df['Produkttyp'] == 'Lizenz')
-                ]
-                if not license_match.empty:
-                    license_unpublish = license_match.iloc[0].get('Unpublication Date', None)
-                    if not pd.isna(license_unpublish) and str(license_unpublish).strip() not in ['', 'nan']:
-                        unpublication_date = license_unpublish
-            
-            # CRM-Eintrag suchen - direkte Suche in der kombinierten Site-ID-Duda Spalte
-            crm_match = self.crm_df[self.crm_df['Site-ID-Duda'] == site_alias]
-            
-            if crm_match.empty:
-                # Site nicht im CRM gefunden
-                issues.append({
-                    'Site_Alias': site_alias,
-                    'Site_URL': duda_row.get('Site URL', ''),
-                    'Produkttyp': product_type,
-                    'Charge_Frequency': duda_row['Charge Frequency'],
-                    'CRM_Status': 'Nicht gefunden',
-                    'Projektname': 'Nicht gefunden',
-                    'Problem_Typ': 'Site nicht im CRM',
-                    'Unpublish_Tage': days_since_date(unpublication_date) if unpublication_date else None
-                })
-            
-            else:
-                # CRM-Eintrag gefunden, Status prüfen
-                crm_row = crm_match.iloc[0]
-                workflow_status = crm_row['Workflow-Status']
-                
-                if not self.is_status_ok(workflow_status, unpublication_date):
-                    # Für Apps: Prüfen ob es eine zugehörige Lizenz-Site mit OK-Status gibt
-                    if is_app_product(product_type):
-                        # Prüfen ob es eine Lizenz-Site mit gleichem Alias und OK-Status gibt
-                        license_match = self.duda_df[
-                            (self.duda_df['Site Alias'] == site_alias) & 
-                            (self.duda_df['Produkttyp'] == 'Lizenz')
-                        ]
-                        
-                        if not license_match.empty:
-                            # Verwende das Unpublication Date der Lizenz für die Bewertung
-                            license_unpublish = license_match.iloc[0].get('Unpublication Date', None)
-                            if self.is_status_ok(workflow_status, license_unpublish):
-                                continue  # App ist OK weil zugehörige Lizenz OK ist
-                        
-                        # App ist problematisch: entweder keine Lizenz gefunden oder Lizenz auch nicht OK
-                        problem_reason = "ohne Website online" if not license_match.empty else "keine zugehörige Lizenz gefunden"
-                        issues.append({
-                            'Site_Alias': site_alias,
-                            'Site_URL': duda_row.get('Site URL', ''),
-                            'Produkttyp': product_type,
-                            'Charge_Frequency': duda_row['Charge Frequency'],
-                            'CRM_Status': workflow_status,
-                            'Projektname': crm_row['Projektname'],
-                            'Problem_Typ': f'{product_type} {problem_reason}',
-                            'Unpublish_Tage': days_since_date(unpublication_date) if unpublication_date else None
-                        })
-                    
-                    else:
-                        # Für Lizenzen und Shops: Status muss OK sein (inkl. unpublication_date check)
-                        days_unpublished = days_since_date(unpublication_date) if unpublication_date else None
-                        
-                        issues.append({
-                            'Site_Alias': site_alias,
-                            'Site_URL': duda_row.get('Site URL', ''),
-                            'Produkttyp': product_type,
-                            'Charge_Frequency': duda_row['Charge Frequency'],
-                            'CRM_Status': workflow_status,
-                            'Projektname': crm_row['Projektname'],
-                            'Problem_Typ': 'Abweichender Workflow-Status',
-                            'Unpublish_Tage': days_unpublished
-                        })
-        
-        return pd.DataFrame(issues)
+        site_alias = duda_df['Site Alias']  # vom Loader bereits als getrimmter String normalisiert
+        product_type = duda_df['Produkttyp']
+        app_types = [pt for pt in product_type.unique() if is_app_product(pt)]
+        is_app = product_type.isin(app_types)
+        
+        if 'Unpublication Date' in duda_df.columns:
+            unpublication = duda_df['Unpublication Date']
+        else:
+            unpublication = pd.Series(None, index=duda_df.index, dtype=object)
+        
+        # Erste Lizenz pro Site-ID (inkl. deren Unpublication Date)
+        licenses = duda_df.loc[product_type == 'Lizenz', ['Site Alias']].assign(
+            license_unpublish=unpublication[product_type == 'Lizenz']
+        ).drop_duplicates('Site Alias')
+        has_license = site_alias.isin(licenses['Site Alias'])
+        license_unpublish = site_alias.map(licenses.set_index('Site Alias')['license_unpublish'])
+        
+        # Für Apps: Unpublication Date von zugehöriger Lizenz-Site übernehmen falls leer
+        inherit_date = is_app & ~self._has_value(unpublication) & has_license & self._has_value(license_unpublish)
+        unpublication = unpublication.astype(object).where(~inherit_date, license_unpublish)
+        
+        # CRM-Eintrag per Join - bei mehreren Einträgen zählt der erste (wie bisher)
+        crm_first = self.crm_df.drop_duplicates('Site-ID-Duda')[['Site-ID-Duda', 'Workflow-Status', 'Projektname']]
+        merged = pd.DataFrame({'Site-ID-Duda': site_alias.values}).merge(
+            crm_first, on='Site-ID-Duda', how='left', indicator=True, validate='many_to_one'
+        ).set_axis(duda_df.index)
+        in_crm = merged['_merge'] == 'both'
+        workflow_status = merged['Workflow-Status'].astype(object)
+        
+        # Status prüfen - Apps sind auch OK wenn die zugehörige Lizenz mit ihrem Datum OK ist
+        # Status-Texte nur einmal auswerten und mit beiden Datumsmasken kombinieren
+        online, offline = self._status_masks(workflow_status)
+        unpublish_days = self._days_since(unpublication)
+        status_ok = online | (offline & self._recent_mask(unpublish_days, duda_df.index))
+        license_recent = self._recent_mask(self._days_since(license_unpublish), duda_df.index)
+        license_ok = is_app & has_license & (online | (offline & license_recent))
+        
+        issue_mask = ~in_crm | (~status_ok & ~license_ok)
+        if not issue_mask.any():
+            return pd.DataFrame()
+        
+        problem_type = pd.Series('Abweichender Workflow-Status', index=duda_df.index, dtype=object)
+        problem_type[is_app] = product_type[is_app] + ' keine zugehörige Lizenz gefunden'
+        problem_type[is_app & has_license] = product_type[is_app & has_license] + ' ohne Website online'
+        problem_type[~in_crm] = 'Site nicht im CRM'
+        
+        issues = pd.DataFrame({
+            'Site_Alias': site_alias,
+            'Site_URL': duda_df['Site URL'] if 'Site URL' in duda_df.columns else '',
+            'Produkttyp': product_type,
+            'Charge_Frequency': duda_df['Charge Frequency'],
+            'CRM_Status': workflow_status.where(in_crm, 'Nicht gefunden'),
+            'Projektname': merged['Projektname'].astype(object).where(in_crm, 'Nicht gefunden'),
+            'Problem_Typ': problem_type,
+            'Unpublish_Tage': pd.Series(unpublish_days, index=duda_df.index, dtype=object)
+        }, index=duda_df.index)
+        
+        # Gleiche Spaltentypen wie beim zeilenweisen Aufbau (z.B. Unpublish_Tage int/float)
+        return issues[issue_mask].reset_index(drop=True).astype(object).infer_objects()
     
     def get_summary(self):
-        """Erstellt eine Zusammenfassung der Analyse"""
+        """Erstellt eine Zusammenfassung der Analyse (gecacht pro Instanz)"""
+        if self._summary is None:
+            self._summary = self._compute_summary()
+        return self._summary
+    
+    def _compute_summary(self):
+        """Berechnet Gesamtzahlen und Breakdown nach Produkttyp"""
         total_charged = len(self.duda_df)
         issues_df = self.find_issues()
         issues_count = len(issues_df)
         ok_count = total_charged - issues_count
         
         # Breakdown nach Produkttyp
+        # Anzahlen einmal zählen und pro Produkttyp nachschlagen statt Maske pro Typ über alle Zeilen
         product_breakdown = {}
+        product_totals = self.duda_df['Produkttyp'].value_counts().to_dict()
+        product_issue_counts = issues_df['Produkttyp'].value_counts().to_dict() if not issues_df.empty else {}
         for product_type in self.duda_df['Produkttyp'].unique():
-            product_total = len(self.duda_df[self.duda_df['Produkttyp'] == product_type])
-            product_issues = len(issues_df[issues_df['Produkttyp'] == product_type]) if not issues_df.empty else 0
+            product_total = product_totals[product_type]
+            product_issues = product_issue_counts.get(product_type, 0)
             product_ok = product_total - product_issues
             
             product_breakdown[product_type] = {
@@ -3,11 +3,42 @@ File Processing Klasse für die Duda Rechnungskontrolle
 Verarbeitet CSV-Dateien von Duda und CRM mit automatischer Fehlerkorrektur
 """
 
+import logging
 import streamlit as st
 import pandas as pd
-import chardet
-from io import StringIO
-from utils import extract_domain, categorize_charge_frequency, is_app_product
+from chardet.universaldetector import UniversalDetector
+import codecs
+from bisect import bisect_left
+from io import BytesIO
+from utils import extract_domain, categorize_charge_frequencies, is_app_product
+
+# Optional: pyarrow parst CSV-Dateien multithreaded (Fallback auf die C-Engine)
+try:
+    import pyarrow
+    import pyarrow.csv as pyarrow_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Zusätzliche Leerwerte der C-Engine, die pyarrow standardmäßig nicht kennt
+PANDAS_EXTRA_NULL_VALUES = ['<NA>', 'None']
+
+# ID-Spalten (nie leer) als Arrow-Strings - String-Vergleiche und Merge laufen dann in C++
+ID_STRING_DTYPE = 'string[pyarrow]' if PYARROW_AVAILABLE else object
+
+# Anzahl Bytes die chardet zur Encoding-Erkennung bekommt (Stichprobe statt ganzer Datei)
+ENCODING_SAMPLE_BYTES = 65536
+
+# Blockgröße für die schrittweise Encoding-Erkennung
+ENCODING_CHUNK_BYTES = 4096
+
+# Spalten der Duda-Rechnung die weiterverarbeitet werden (Rest wird beim Parsen übersprungen)
+DUDA_COLUMNS = frozenset({'Site Alias', 'Site URL', 'Charge Frequency', 'Should Charge', 'Unpublication Date'})
+
+# Schlüsselwörter der CRM-Spalten die erkannt werden (Domain, Site-IDs, Workflow-Status, Projektname)
+CRM_COLUMN_KEYWORDS = ('domain', 'duda', 'workflow', 'projekt')
 
 
 class FileProcessor:
@@ -17,104 +48,204 @@ class FileProcessor:
         pass
     
     def detect_encoding(self, file_content):
-        """Erkennt das Encoding einer Datei"""
-        result = chardet.detect(file_content)
-        return result['encoding']
+        """Erkennt das Encoding einer Datei (BOM- und ASCII-Prüfung, sonst chardet auf einer Stichprobe)"""
+        # Byte Order Mark ist eindeutig - keine Erkennung nötig
+        if file_content.startswith(codecs.BOM_UTF8):
+            return 'utf-8-sig'
+        if file_content.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return 'utf-16'
+        
+        # Reines ASCII (häufig bei Duda-Exporten) - bytes.isascii läuft in C über die ganze Datei
+        if file_content.isascii():
+            return 'utf-8'
+        
+        # Stichprobe nur ASCII - die Umlaute stehen weiter hinten, dann ganze Datei prüfen
+        sample = file_content[:ENCODING_SAMPLE_BYTES]
+        if sample.isascii():
+            sample = file_content
+        
+        # Blockweise füttern und abbrechen sobald chardet sicher ist (z.B. UTF-8 nach wenigen Umlauten)
+        detector = UniversalDetector()
+        for start in range(0, len(sample), ENCODING_CHUNK_BYTES):
+            detector.feed(sample[start:start + ENCODING_CHUNK_BYTES])
+            if detector.done:
+                break
+        
+        return detector.close()['encoding']
+    
+    def read_csv(self, file_content, encoding, usecols, delimiter=','):
+        """Parst CSV-Bytes direkt (ohne Zwischen-String) - mit pyarrow falls verfügbar, sonst mit der C-Engine"""
+        # Alle Spalten als Text lesen: die Typ-Erkennung würde IDs (5e+13, führende Nullen) und
+        # Should Charge ("true") je nach Engine unterschiedlich umwandeln
+        if PYARROW_AVAILABLE:
+            try:
+                # pyarrow kennt keinen Spaltenfilter als Funktion - vorab über die Kopfzeile auflösen
+                header = pd.read_csv(BytesIO(file_content), encoding=encoding, nrows=0, delimiter=delimiter)
+                columns = [col for col in header.columns if usecols(col)]
+                table = pyarrow_csv.read_csv(
+                    BytesIO(file_content),
+                    read_options=pyarrow_csv.ReadOptions(encoding=encoding),
+                    parse_options=pyarrow_csv.ParseOptions(delimiter=delimiter),
+                    convert_options=pyarrow_csv.ConvertOptions(
+                        include_columns=columns,
+                        column_types={col: pyarrow.string() for col in columns},
+                        null_values=pyarrow_csv.ConvertOptions().null_values + PANDAS_EXTRA_NULL_VALUES,
+                        strings_can_be_null=True
+                    )
+                )
+                # pyarrow liefert None statt NaN - angleichen an die C-Engine
+                df = table.to_pandas()
+                return df.where(df.notna(), float('nan'))
+            except (pyarrow.ArrowException, ValueError) as e:
+                logger.warning("pyarrow konnte die CSV-Datei nicht parsen, Fallback auf die C-Engine: %s", e)
+        # C-Engine dekodiert selbst; low_memory=False vermeidet gestückeltes Parsen
+        return pd.read_csv(
+            BytesIO(file_content),
+            encoding=encoding,
+            engine='c',
+            low_memory=False,
+            dtype=str,
+            delimiter=delimiter,
+            usecols=usecols
+        )
+    
+    def _build_domain_index(self, crm_df):
+        """Sortierte Liste (umgekehrte Domain, Site-ID) aller CRM-Domains für _find_crm_matches"""
+        # Jede verschiedene CRM-Domain nur einmal parsen - große CRMs verdrängen so nicht den extract_domain-Cache
+        crm_domain_values = crm_df['Domain'].fillna('').astype(str)
+        normalized_domains = {value: extract_domain.__wrapped__(value) for value in crm_domain_values.unique()}
+        crm_domains = crm_domain_values.map(normalized_domains)
+        return sorted(
+            (domain[::-1], str(site_id))
+            for domain, site_id in zip(crm_domains, crm_df['Site-ID-Duda'])
+            if domain
+        )
+    
+    def _find_crm_matches(self, domain_index, domain):
+        """Site-IDs aller CRM-Einträge deren Domain gleich der Domain oder eine Subdomain davon ist (Binärsuche)"""
+        # Regel für die ID-Reparatur: CRM shop.beispiel.at passt zur Site beispiel.at, aber nicht umgekehrt,
+        # und meinbeispiel.at passt nicht - repariert wird nur bei genau einem Treffer
+        reversed_domain = domain[::-1]
+        matches = []
+        
+        # Umgekehrte Domains mit gleichem Präfix liegen in der sortierten Liste direkt hintereinander
+        position = bisect_left(domain_index, (reversed_domain,))
+        while position < len(domain_index) and domain_index[position][0].startswith(reversed_domain):
+            candidate, site_id = domain_index[position]
+            # Nur ganze Labels zählen (z.B. shop.beispiel.at, aber nicht meinbeispiel.at)
+            if len(candidate) == len(reversed_domain) or candidate[len(reversed_domain)] == '.':
+                matches.append(site_id)
+            position += 1
+        
+        return matches
     
     def fix_scientific_notation_ids(self, duda_df, crm_df):
         """Repariert Site IDs die als wissenschaftliche Notation fehlinterpretiert wurden"""
         
+        # Schnelle Vorprüfung: ohne Exponent-Vorzeichen keine wissenschaftliche Notation (Normalfall)
+        site_aliases = duda_df['Site Alias']
+        candidates = site_aliases.str.contains('+', regex=False) | site_aliases.str.contains('-', regex=False)
+        if not candidates.any():
+            return duda_df
+        
         # Finde Einträge mit wissenschaftlicher Notation
-        scientific_mask = duda_df['Site Alias'].astype(str).str.contains(r'[eE][+-]', na=False, regex=True)
-        problematic_rows = duda_df[scientific_mask].copy()
+        # Zwei literale Suchen statt Regex [eE][+-] (kein re-Overhead bei kurzen IDs) - nur auf Kandidaten
+        candidate_rows = duda_df[candidates.to_numpy()]
+        candidate_aliases = site_aliases[candidates.to_numpy()].str.lower()
+        scientific_mask = candidate_aliases.str.contains('e+', regex=False) | candidate_aliases.str.contains('e-', regex=False)
+        problematic_rows = candidate_rows[scientific_mask.to_numpy()]
         
         if len(problematic_rows) == 0:
             return duda_df
         
+        # Erst hier kopieren - die Reparaturen schreiben per .loc in den DataFrame
+        duda_df = duda_df.copy()
+        
         st.info(f"🔧 Repariere {len(problematic_rows)} Site IDs mit wissenschaftlicher Notation...")
         
         repairs_made = []
-        repaired_scientific_ids = set()  # Track welche IDs bereits repariert wurden
         
-        # Für jeden problematischen Eintrag
-        for idx, row in problematic_rows.iterrows():
-            site_alias_scientific = str(row['Site Alias']).strip()
-            
-            # Skip wenn diese ID bereits repariert wurde
-            if site_alias_scientific in repaired_scientific_ids:
-                continue
-                
-            site_url = str(row.get('Site URL', '')).strip()
-            product_type = categorize_charge_frequency(row.get('Charge Frequency', ''))
+        # Gültige URLs einmal für alle Zeilen bestimmen
+        site_urls = duda_df['Site URL']
+        has_url = site_urls.notna() & (site_urls != '') & (site_urls != 'nan')
+        
+        # CRM-Domains einmal normalisieren und sortieren - danach Suffix-Suche per Binärsuche
+        # CRM-Treffer pro Domain nur einmal suchen (Domain → (Anzahl Treffer, erste Site-ID))
+        domain_index = self._build_domain_index(crm_df) if 'Domain' in crm_df.columns else None
+        crm_matches_by_domain = {}
+        
+        # Gefundene Reparaturen (wissenschaftliche ID → (korrekte ID, URL)) - werden am Ende gesammelt angewendet
+        id_repairs = {}
+        
+        # Pro wissenschaftlicher ID gruppiert - Zeilen einer Gruppe nacheinander bis zur ersten Reparatur
+        group_keys = problematic_rows['Site Alias']
+        problem_product_types = categorize_charge_frequencies(problematic_rows['Charge Frequency'])
+        for site_alias_scientific, group in problematic_rows.groupby(group_keys, sort=False):
+            # Für Apps ohne URL: erste URL eines anderen Eintrags mit derselben ID (meist Lizenz)
+            group_urls = site_urls[group.index][has_url[group.index]]
+            fallback_url = str(group_urls.iloc[0]).strip() if not group_urls.empty else None
             
             repaired = False
             
-            # Strategie 1: Für Apps - suche nach URL bei anderen Einträgen mit derselben wissenschaftlichen Notation
-            if is_app_product(product_type) and (not site_url or site_url == 'nan'):
-                # Finde andere Einträge mit derselben wissenschaftlichen Notation aber mit URL
-                same_scientific_id = duda_df[
-                    (duda_df['Site Alias'] == site_alias_scientific) & 
-                    (duda_df['Site URL'].notna()) & 
-                    (duda_df['Site URL'] != '') & 
-                    (duda_df['Site URL'] != 'nan')
-                ]
+            for site_url, product_type in zip(group['Site URL'], problem_product_types[group.index]):
+                site_url = str(site_url).strip()
                 
-                if not same_scientific_id.empty:
-                    # Nehme die URL vom ersten verfügbaren Eintrag (meist Lizenz)
-                    site_url = str(same_scientific_id.iloc[0]['Site URL']).strip()
+                # Strategie 1: Für Apps - URL von einem anderen Eintrag mit derselben wissenschaftlichen Notation
+                if is_app_product(product_type) and (not site_url or site_url == 'nan') and fallback_url is not None:
+                    site_url = fallback_url
                     repairs_made.append(f"📋 {product_type} {site_alias_scientific}: URL von Lizenz-Eintrag übernommen ({site_url})")
-            
-            # Strategie 2: Domain-basierte Reparatur (für alle Produkttypen mit gültiger URL)
-            if site_url and site_url != 'nan':
-                # Domain aus URL extrahieren
-                domain = extract_domain(site_url)
                 
-                # Im CRM nach dieser Domain suchen
-                if 'Domain' in crm_df.columns:
-                    crm_matches = crm_df[
-                        crm_df['Domain'].astype(str).str.contains(
-                            domain.replace('.', r'\.'), 
-                            case=False, 
-                            na=False, 
-                            regex=True
-                        )
-                    ]
+                # Strategie 2: Domain-basierte Reparatur (für alle Produkttypen mit gültiger URL)
+                if site_url and site_url != 'nan':
+                    # Domain aus URL extrahieren
+                    domain = extract_domain(site_url)
                     
-                    if len(crm_matches) == 1:
-                        # Eindeutige Übereinstimmung gefunden
-                        correct_id = str(crm_matches.iloc[0]['Site-ID-Duda']).strip()
-                        
-                        # Alle Einträge mit dieser wissenschaftlichen Notation korrigieren
-                        all_same_scientific = duda_df['Site Alias'] == site_alias_scientific
-                        count_repaired = all_same_scientific.sum()
-                        duda_df.loc[all_same_scientific, 'Site Alias'] = correct_id
-                        
-                        # Auch die Site URL für alle korrigieren falls leer
-                        empty_url_mask = (
-                            (duda_df['Site Alias'] == correct_id) & 
-                            ((duda_df['Site URL'].isna()) | (duda_df['Site URL'] == '') | (duda_df['Site URL'] == 'nan'))
-                        )
-                        duda_df.loc[empty_url_mask, 'Site URL'] = site_url
+                    # Im CRM nach dieser Domain suchen
+                    if domain_index is not None:
+                        if domain not in crm_matches_by_domain:
+                            matches = self._find_crm_matches(domain_index, domain)
+                            crm_matches_by_domain[domain] = (len(matches), matches[0] if matches else None)
+                        match_count, correct_id = crm_matches_by_domain[domain]
                         
-                        repairs_made.append(f"✅ {site_alias_scientific} → {correct_id} (via Domain: {domain}) - {count_repaired} Einträge")
-                        repaired_scientific_ids.add(site_alias_scientific)
-                        repaired = True
-                        
-                    elif len(crm_matches) > 1:
-                        repairs_made.append(f"⚠️ Mehrere CRM-Einträge für Domain {domain}")
+                        if match_count == 1:
+                            # Alle Einträge mit dieser wissenschaftlichen Notation korrigieren (nach der Schleife)
+                            id_repairs[site_alias_scientific] = (correct_id, site_url)
+                            
+                            repairs_made.append(f"✅ {site_alias_scientific} → {correct_id} (via Domain: {domain}) - {len(group)} Einträge")
+                            repaired = True
+                            
+                        elif match_count > 1:
+                            repairs_made.append(f"⚠️ Mehrere CRM-Einträge für Domain {domain}")
+                        else:
+                            repairs_made.append(f"❌ Keine CRM-Übereinstimmung für Domain {domain}")
                     else:
-                        repairs_made.append(f"❌ Keine CRM-Übereinstimmung für Domain {domain}")
-                else:
-                    repairs_made.append(f"❌ Keine Domain-Spalte im CRM gefunden")
-            
-            if not repaired and site_alias_scientific not in repaired_scientific_ids:
+                        repairs_made.append(f"❌ Keine Domain-Spalte im CRM gefunden")
+                
+                if repaired:
+                    break
                 repairs_made.append(f"❌ Konnte {site_alias_scientific} ({product_type}) nicht reparieren")
         
+        # Alle Reparaturen in einem Schritt anwenden statt Spaltenvergleich pro reparierter ID
+        if id_repairs:
+            repaired_keys = group_keys[group_keys.isin(id_repairs.keys())]
+            repaired_empty = repaired_keys.index[~has_url[repaired_keys.index].to_numpy()]
+            
+            # Leere URLs bestehender Einträge mit der korrekten ID bekommen die URL der ersten Reparatur darauf
+            first_url_by_id = {}
+            for correct_id, site_url in id_repairs.values():
+                first_url_by_id.setdefault(correct_id, site_url)
+            existing_empty = ~has_url & duda_df['Site Alias'].isin(first_url_by_id.keys())
+            duda_df.loc[existing_empty, 'Site URL'] = duda_df.loc[existing_empty, 'Site Alias'].map(first_url_by_id)
+            
+            # Reparierte Einträge: korrekte ID und bei leerer URL die URL ihrer eigenen Reparatur
+            duda_df.loc[repaired_keys.index, 'Site Alias'] = repaired_keys.map({key: repair[0] for key, repair in id_repairs.items()})
+            duda_df.loc[repaired_empty, 'Site URL'] = repaired_keys[repaired_empty].map({key: repair[1] for key, repair in id_repairs.items()})
+        
         # Reparatur-Log anzeigen
         if repairs_made:
             with st.expander("🔧 Details der Site ID Reparaturen"):
-                for repair in repairs_made:
-                    st.text(repair)
+                # Ein einziges Element statt eines Frontend-Updates pro Zeile
+                st.text("\n".join(repairs_made))
         
         return duda_df
     
@@ -122,14 +253,11 @@ class FileProcessor:
         """Lädt und verarbeitet eine Duda-Rechnungsdatei"""
         try:
             # Encoding erkennen
-            file_content = uploaded_file.read()
+            file_content = uploaded_file.getvalue()
             encoding = self.detect_encoding(file_content)
             
-            # Als String dekodieren
-            content_str = file_content.decode(encoding)
-            
-            # CSV parsen - Site Alias als String erzwingen um wissenschaftliche Notation zu vermeiden
-            df = pd.read_csv(StringIO(content_str), dtype={'Site Alias': str})
+            # CSV parsen - alle Spalten als Text, so bleibt z.B. wissenschaftliche Notation in Site Alias erhalten
+            df = self.read_csv(file_content, encoding, usecols=lambda col: col in DUDA_COLUMNS)
             
             # Relevante Spalten prüfen
             required_columns = ['Site Alias', 'Site URL', 'Charge Frequency', 'Should Charge']
@@ -142,76 +270,65 @@ class FileProcessor:
             if 'Unpublication Date' not in df.columns:
                 st.info("ℹ️ Keine 'Unpublication Date' Spalte gefunden - Kalendermonat-Regel wird nicht angewendet")
             
-            # Site Alias als String erzwingen und problematische IDs reparieren
-            df['Site Alias'] = df['Site Alias'].astype(str)
+            # Site Alias einmal als getrimmten String normalisieren - nachgelagerter Code castet/trimmt nicht erneut
+            df['Site Alias'] = df['Site Alias'].astype(str).str.strip().astype(ID_STRING_DTYPE)
             
-            # Datentypen korrigieren
-            df['Should Charge'] = pd.to_numeric(df['Should Charge'], errors='coerce').fillna(0).astype(int)
+            # Datentypen korrigieren - true/false (Groß-/Kleinschreibung egal) als 1/0 werten, da alle Spalten als Text kommen
+            should_charge = df['Should Charge'].str.strip().str.lower().replace({'true': '1', 'false': '0'})
+            df['Should Charge'] = pd.to_numeric(
+                pd.to_numeric(should_charge, errors='coerce').fillna(0).astype(int),
+                downcast='integer'
+            )
             
             # Nur verrechenbare Einträge filtern
-            df = df[df['Should Charge'] == 1].copy()
+            df = df[df['Should Charge'] == 1]
             
             return df
             
         except Exception as e:
             raise Exception(f"Fehler beim Laden der Duda-Datei: {str(e)}")
     
+    def _find_column(self, lower_columns, *terms):
+        """Erste Spalte deren kleingeschriebener Name alle Begriffe enthält (sonst None)"""
+        return next((col for col_lower, col in lower_columns if all(term in col_lower for term in terms)), None)
+    
     def load_crm_file(self, uploaded_file):
         """Lädt und verarbeitet eine CRM-Exportdatei"""
         try:
             # Encoding erkennen
-            file_content = uploaded_file.read()
+            file_content = uploaded_file.getvalue()
             encoding = self.detect_encoding(file_content)
             
-            # Als String dekodieren
-            content_str = file_content.decode(encoding)
-            
-            # CSV parsen (Semikolon als Delimiter für deutsche CSV)
-            df = pd.read_csv(StringIO(content_str), delimiter=';')
+            # CSV parsen (Semikolon als Delimiter für deutsche CSV) - nur die benötigten Spalten
+            df = self.read_csv(
+                file_content,
+                encoding,
+                usecols=lambda col: any(keyword in col.lower() for keyword in CRM_COLUMN_KEYWORDS),
+                delimiter=';'
+            )
             
-            # Verfügbare Spalten finden und Domain-Spalte identifizieren
-            available_columns = df.columns.tolist()
+            # Spaltennamen einmal kleinschreiben (Reihenfolge bleibt erhalten - erster Treffer zählt)
+            lower_columns = [(col.lower(), col) for col in df.columns]
             
             # Domain-Spalte finden
-            domain_column = None
-            for col in available_columns:
-                if 'domain' in col.lower():
-                    domain_column = col
-                    break
-            
-            # Site-ID Spalten finden (Standard + Landingpage)
-            site_id_column = None
-            landingpage_id_column = None
+            domain_column = self._find_column(lower_columns, 'domain')
             
-            for col in available_columns:
-                col_lower = col.lower()
-                if 'duda' in col_lower and 'site' in col_lower and 'id' in col_lower:
-                    # Exakte Übereinstimmung für Landingpage-Spalte
-                    if col_lower in ['site-id-duda', 'site_id_duda']:
-                        landingpage_id_column = col
-                    # Standard-Spalte (Duda-Site-ID)
-                    elif col_lower in ['duda-site-id', 'duda_site_id']:
-                        site_id_column = col
+            # Site-ID Spalten finden (Standard + Landingpage) - exakte Namen, direkt nachschlagen
+            column_by_lower = dict(lower_columns)
+            landingpage_id_column = column_by_lower.get('site-id-duda') or column_by_lower.get('site_id_duda')
+            site_id_column = column_by_lower.get('duda-site-id') or column_by_lower.get('duda_site_id')
             
             if site_id_column is None:
                 raise ValueError("Keine Standard Duda-Site-ID Spalte gefunden")
             
             # Workflow-Status Spalte finden
-            status_column = None
-            for col in available_columns:
-                if 'workflow' in col.lower() and 'status' in col.lower():
-                    status_column = col
-                    break
+            status_column = self._find_column(lower_columns, 'workflow', 'status')
             
             if status_column is None:
                 raise ValueError("Keine Workflow-Status Spalte gefunden")
             
             # Projektname Spalte finden
-            project_column = None
-            for col in available_columns:
-                if 'projekt' in col.lower():
-                    project_column = col
-                    break
+            project_column = self._find_column(lower_columns, 'projekt')
             
             # DataFrame mit standardisierten Spaltennamen erstellen
             result_df = pd.DataFrame()
@@ -235,35 +352,37 @@ class FileProcessor:
                 result_df['Landingpage-ID'] = result_df['Landingpage-ID'].astype(str).str.strip()
                 result_df.loc[result_df['Landingpage-ID'] == 'nan', 'Landingpage-ID'] = ''
             
-            # WICHTIG: Zusätzliche Zeilen für Landingpages erstellen
-            landingpage_rows = []
+            # WICHTIG: Zusätzliche Zeilen für Landingpages erstellen (Masken statt Schleife über alle Zeilen)
             if landingpage_id_column is not None:
-                for idx, row in df.iterrows():
-                    landingpage_id = row[landingpage_id_column]
-                    if pd.notna(landingpage_id) and str(landingpage_id).strip() not in ['', 'nan']:
-                        landingpage_id_clean = str(landingpage_id).strip()
-                        
-                        # Prüfe ob bereits in Standard-Spalte vorhanden
-                        standard_ids = df[site_id_column].dropna().astype(str).str.strip().tolist()
-                        
-                        if landingpage_id_clean not in standard_ids:
-                            # Neue Landingpage-Zeile erstellen
-                            new_row = {
-                                'Site-ID-Duda': landingpage_id_clean,
-                                'Workflow-Status': str(row[status_column]).strip(),
-                                'Domain': str(row[domain_column]).strip() if domain_column else '',
-                                'Projektname': f"{str(row[project_column]).strip()} (Landingpage)" if project_column else 'Landingpage',
-                                'Landingpage-ID': landingpage_id_clean
-                            }
-                            landingpage_rows.append(new_row)
+                # Standard-IDs einmal vorab als Set (nicht pro Zeile neu berechnen)
+                standard_ids = set(df[site_id_column].dropna().astype(str).str.strip())
+                
+                # Gültige Landingpage-IDs die nicht bereits in der Standard-Spalte vorkommen
+                landingpage_ids = df[landingpage_id_column].astype(str).str.strip()
+                landingpage_mask = (
+                    df[landingpage_id_column].notna()
+                    & ~landingpage_ids.isin(['', 'nan'])
+                    & ~landingpage_ids.isin(standard_ids)
+                )
                 
                 # Landingpage-Zeilen hinzufügen
-                if landingpage_rows:
-                    landingpage_df = pd.DataFrame(landingpage_rows)
+                if landingpage_mask.any():
+                    landingpage_source = df[landingpage_mask]
+                    landingpage_df = pd.DataFrame({
+                        'Site-ID-Duda': landingpage_ids[landingpage_mask],
+                        'Workflow-Status': landingpage_source[status_column].astype(str).str.strip(),
+                        'Domain': landingpage_source[domain_column].astype(str).str.strip() if domain_column else '',
+                        'Projektname': (
+                            landingpage_source[project_column].astype(str).str.strip() + ' (Landingpage)'
+                            if project_column else 'Landingpage'
+                        ),
+                        'Landingpage-ID': landingpage_ids[landingpage_mask]
+                    })
                     result_df = pd.concat([result_df, landingpage_df], ignore_index=True)
             
-            # Workflow-Status bereinigen
-            result_df['Workflow-Status'] = result_df['Workflow-Status'].astype(str).str.strip()
+            # Workflow-Status bereinigen (wenige verschiedene Werte - als Kategorie speichern)
+            result_df['Workflow-Status'] = result_df['Workflow-Status'].astype(str).str.strip().astype('category')
+            result_df['Site-ID-Duda'] = result_df['Site-ID-Duda'].astype(ID_STRING_DTYPE)
             
             return result_df
             
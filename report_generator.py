@@ -4,7 +4,8 @@ Erstellt CSV-Berichte mit Zusammenfassungen und API-Ergebnissen
 """
 
 import pandas as pd
-from io import StringIO
+from io import BytesIO, TextIOWrapper
+from utils import select_available_columns
 
 
 class ReportGenerator:
@@ -14,8 +15,10 @@ class ReportGenerator:
         pass
     
     def generate_csv_report(self, issues_df, summary, api_results=None):
-        """Generiert einen CSV-Bericht der Kontrollergebnisse"""
-        output = StringIO()
+        """Generiert einen CSV-Bericht der Kontrollergebnisse (UTF-8 Bytes für den Download)"""
+        # Direkt in einen Byte-Puffer schreiben - kein zusätzlicher CSV-String im Speicher
+        buffer = BytesIO()
+        output = TextIOWrapper(buffer, encoding='utf-8', newline='')
         
         # Header mit Zusammenfassung
         output.write("# Duda Rechnungskontrolle - Bericht\n")
@@ -46,21 +49,23 @@ class ReportGenerator:
         
         # Problematische Einträge als CSV
         if not issues_df.empty:
-            # DataFrame zu CSV konvertieren
-            csv_string = issues_df.to_csv(index=False, sep=';', encoding='utf-8')
-            output.write(csv_string)
+            # DataFrame direkt in den Puffer schreiben
+            issues_df.to_csv(output, index=False, sep=';')
         else:
             output.write("Site_Alias;Site_URL;Produkttyp;Charge_Frequency;CRM_Status;Projektname;Problem_Typ\n")
             output.write("# Keine problematischen Einträge gefunden!\n")
         
-        return output.getvalue()
+        output.flush()
+        output.detach()
+        return buffer.getvalue()
     
     def generate_false_positives_report(self, false_positives):
-        """Generiert einen separaten Bericht für False Positives"""
+        """Generiert einen separaten Bericht für False Positives (UTF-8 Bytes für den Download)"""
         if not false_positives:
-            return "# Keine False Positives gefunden\n"
+            return "# Keine False Positives gefunden\n".encode('utf-8')
         
-        output = StringIO()
+        buffer = BytesIO()
+        output = TextIOWrapper(buffer, encoding='utf-8', newline='')
         
         # Header
         output.write("# False Positives Report - Eliminierte Probleme\n")
@@ -79,13 +84,14 @@ class ReportGenerator:
         ]
         
         # Nur verfügbare Spalten verwenden
-        available_columns = [col for col in columns_to_include if col in fp_df.columns]
+        report_df = select_available_columns(fp_df, columns_to_include)
         
-        if available_columns:
-            csv_string = fp_df[available_columns].to_csv(index=False, sep=';', encoding='utf-8')
-            output.write(csv_string)
+        if not report_df.columns.empty:
+            report_df.to_csv(output, index=False, sep=';')
         
-        return output.getvalue()
+        output.flush()
+        output.detach()
+        return buffer.getvalue()
     
     def generate_summary_metrics(self, summary, api_results=None):
         """Generiert eine kompakte Metrik-Übersicht"""
@@ -0,0 +1,8 @@
+"""
+Gemeinsame Test-Konfiguration: Projektverzeichnis importierbar machen
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,103 @@
+"""
+Tests für den FileProcessor (Laden der Duda-Rechnung, Reparatur wissenschaftlicher Site-IDs)
+"""
+
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+import file_processor
+from file_processor import FileProcessor
+
+
+DUDA_HEADER = "Site Alias,Site URL,Charge Frequency,Should Charge\n"
+
+
+@pytest.fixture(params=[True, False], ids=['pyarrow', 'c-engine'])
+def processor(request, monkeypatch):
+    """FileProcessor einmal mit pyarrow und einmal mit der C-Engine"""
+    if request.param and not file_processor.PYARROW_AVAILABLE:
+        pytest.skip("pyarrow nicht installiert")
+    monkeypatch.setattr(file_processor, 'PYARROW_AVAILABLE', request.param)
+    return FileProcessor()
+
+
+def load_duda(processor, rows):
+    """Lädt eine Duda-Rechnung aus CSV-Zeilen"""
+    return processor.load_duda_file(BytesIO((DUDA_HEADER + rows).encode('utf-8')))
+
+
+def test_should_charge_accepts_true_false(processor):
+    """true/True/TRUE zählen wie 1, false wie 0"""
+    df = load_duda(
+        processor,
+        "abc,abc.at,DudaOne Monthly,true\n"
+        "def,def.at,DudaOne Monthly,1\n"
+        "ghi,ghi.at,DudaOne Monthly,TRUE\n"
+        "jkl,jkl.at,DudaOne Monthly,false\n"
+        "mno,mno.at,DudaOne Monthly,0\n"
+    )
+    assert list(df['Site Alias']) == ['abc', 'def', 'ghi']
+
+
+def test_should_charge_invalid_values_are_not_charged(processor):
+    """Leere oder unbekannte Werte werden nicht verrechnet"""
+    df = load_duda(
+        processor,
+        "abc,abc.at,DudaOne Monthly,\n"
+        "def,def.at,DudaOne Monthly,ja\n"
+        "ghi,ghi.at,DudaOne Monthly,1.0\n"
+    )
+    assert list(df['Site Alias']) == ['ghi']
+
+
+def test_site_alias_keeps_text(processor):
+    """Site Alias bleibt Text (wissenschaftliche Notation und führende Nullen)"""
+    df = load_duda(
+        processor,
+        "5e+13,a.at,DudaOne Monthly,1\n"
+        "00123456,b.at,DudaOne Monthly,1\n"
+    )
+    assert list(df['Site Alias']) == ['5e+13', '00123456']
+
+
+def repair_ids(site_url, crm_domains):
+    """Repariert eine wissenschaftliche Site-ID über die gegebenen CRM-Domains (Site-IDs id0, id1, ...)"""
+    duda_df = pd.DataFrame({
+        'Site Alias': pd.Series(['5e+13'], dtype=file_processor.ID_STRING_DTYPE),
+        'Site URL': [site_url],
+        'Charge Frequency': ['DudaOne Monthly'],
+        'Should Charge': [1]
+    })
+    crm_df = pd.DataFrame({
+        'Site-ID-Duda': [f"id{i}" for i in range(len(crm_domains))],
+        'Domain': crm_domains
+    })
+    return list(FileProcessor().fix_scientific_notation_ids(duda_df, crm_df)['Site Alias'])
+
+
+def test_repair_matches_same_domain():
+    """Gleiche Domain (auch mit Schema/www) wird repariert"""
+    assert repair_ids('https://www.beispiel.at/kontakt', ['beispiel.at', 'anderes.at']) == ['id0']
+
+
+def test_repair_matches_crm_subdomain_of_site_apex():
+    """CRM-Subdomain passt zur Site-Domain"""
+    assert repair_ids('beispiel.at', ['shop.beispiel.at']) == ['id0']
+
+
+def test_repair_ignores_crm_parent_of_site_subdomain():
+    """CRM-Hauptdomain passt nicht zu einer Site-Subdomain"""
+    assert repair_ids('shop.beispiel.at', ['beispiel.at']) == ['5e+13']
+
+
+def test_repair_ignores_partial_labels():
+    """Nur ganze Labels zählen - meinbeispiel.at passt nicht zu beispiel.at"""
+    assert repair_ids('beispiel.at', ['meinbeispiel.at']) == ['5e+13']
+
+
+def test_repair_skips_ambiguous_parent_domain():
+    """Zwei CRM-Einträge unter derselben Domain sind mehrdeutig - keine Reparatur"""
+    assert repair_ids('beispiel.at', ['a.beispiel.at', 'b.beispiel.at']) == ['5e+13']
+    assert repair_ids('a.beispiel.at', ['a.beispiel.at', 'b.beispiel.at']) == ['id0']
@@ -3,18 +3,33 @@ Hilfsfunktionen für die Duda Rechnungskontrolle
 Zentrale Utilities die von mehreren Modulen verwendet werden
 """
 
+import re
 from datetime import datetime
+from functools import lru_cache
 from urllib.parse import urlparse
+import numpy as np
 import pandas as pd
 
 
+# Host einer einfachen URL (mit http(s):// oder ganz ohne Schema) - liefert dasselbe wie der urlparse-Weg
+_SIMPLE_HOST_PATTERN = re.compile(r'(?:https?://|(?!http))([A-Za-z0-9.:@-]*)(?:[/?#]|$)')
+
+
+@lru_cache(maxsize=4096)
 def extract_domain(url):
-    """Extrahiert die Domain aus einer URL"""
+    """Extrahiert die Domain aus einer URL (gecacht - dieselben URLs kommen pro Datei oft mehrfach vor)"""
     if not url or url == 'nan':
         return ''
         
     # URL normalisieren
     url = str(url).strip()
+    
+    # Schneller Weg für gewöhnliche URLs - ungewöhnliche Zeichen gehen über urlparse
+    match = _SIMPLE_HOST_PATTERN.match(url)
+    if match:
+        domain = match.group(1).lower()
+        return domain[4:] if domain.startswith('www.') else domain
+    
     if not url.startswith('http'):
         url = 'https://' + url
         
@@ -125,6 +140,36 @@ def categorize_charge_frequency(charge_frequency):
             return "Apps" # Fallback für unbekannte Apps
 
 
+# Produkttyp-Regeln in Prüfreihenfolge (erster Treffer gewinnt) - identisch zu categorize_charge_frequency
+PRODUCT_TYPE_RULES = (
+    (('dudaone monthly',), 'Lizenz'),
+    (('ecom', 'store'), 'Shop'),
+    (('cookiebot',), 'CCB'),
+    (('audioeye',), 'AudioEye'),
+    (('paperform',), 'Paperform'),
+    (('rss', 'social'), 'RSS/Social'),
+    (('sitesearch',), 'SiteSearch'),
+    (('book like a boss',), 'BookingTool'),
+    (('ivr',), 'IVR'),
+)
+
+
+def categorize_charge_frequencies(charge_frequencies):
+    """Vektorisierte Variante von categorize_charge_frequency für eine ganze Spalte"""
+    freq_lower = charge_frequencies.astype(str).str.lower()
+    conditions = [charge_frequencies.isna()]
+    choices = ['Unbekannt']
+    
+    for terms, product_type in PRODUCT_TYPE_RULES:
+        mask = freq_lower.str.contains(terms[0], regex=False)
+        for term in terms[1:]:
+            mask |= freq_lower.str.contains(term, regex=False)
+        conditions.append(mask)
+        choices.append(product_type)
+    
+    return pd.Series(np.select(conditions, choices, default='Apps'), index=charge_frequencies.index)
+
+
 def format_api_credentials_debug(username, password_masked=True):
     """Formatiert API-Credentials für Debug-Ausgabe (sicher)"""
     if password_masked:
@@ -164,3 +209,8 @@ def safe_string_convert(value, default=""):
     if pd.isna(value) or value is None:
         return default
     return str(value).strip()
+
+
+def select_available_columns(df, columns):
+    """Wählt die vorhandenen Spalten in der angegebenen Reihenfolge aus (fehlende werden übersprungen)"""
+    return df[pd.Index(columns).intersection(df.columns, sort=False)]